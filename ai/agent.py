@@ -1,66 +1,88 @@
+import asyncio
 from ai.ai import GigaChatt
+from ai.chunked import split_into_chunks, merge_findings, build_report
+from ai.prompts import Prompt, CHECK_VERSION, build_check_prompt, build_fragment_prompt, build_composition_prompt, build_essay_prompt
+from ai.cache import CheckCache, make_key
+from ai.singleflight import SingleFlight, fingerprint
+from ai.precheck import pre_checker, format_known
+from config.settings import settings
 
 ai_client = GigaChatt()
-
-
-async def generate_text(prompt: str) -> str:
-    return ai_client.ask(prompt)
-
-
-async def check_essay(text: str) -> str:
-    prompt = f"""Ты - опытный преподаватель русского языка и литературы. Проведи комплексную проверку сочинения и дай развернутый анализ:
-
-1. Орфография:
-   - Найдите и исправьте орфографические ошибки
-   - Укажите правило для каждой ошибки
-
-2. Пунктуация:
-   - Проверьте расстановку знаков препинания
-   - Исправьте ошибки, объясните правила
-
-3. Грамматика:
-   - Проверьте согласование, управление, примыкание
-   - Исправьте грамматические ошибки
-
-4. Стилистика:
-   - Оцените уместность лексики
-   - Отметьте речевые ошибки (тавтология, плеоназм, канцеляризмы)
-   - Проверьте стилистическое единство
-
-5. Логика и композиция:
-   - Оцените логическую связность
-   - Проверьте структуру (введение, основная часть, заключение)
-   - Отметьте нарушения последовательности
-
-6. Содержание:
-   - Оцените раскрытие темы
-   - Проверьте аргументацию
-   - Оцените глубину анализа
-
-7. Общие рекомендации:
-   - Дайте конкретные рекомендации по улучшению
-   - Предложите альтернативные формулировки
-   - Укажите сильные стороны работы
-
-8. Оценка (по 10-балльной шкале):
-   - Орфография и пунктуация: [оценка]
-   - Грамматика и стилистика: [оценка]
-   - Логика и композиция: [оценка]
-   - Содержание: [оценка]
-   - ИТОГОВАЯ ОЦЕНКА: [оценка]
-
-Сочинение для проверки:
-{text}
-
-Предоставь ответ в структурированном виде с выделением ошибок и объяснениями."""
-
-    return await generate_text(prompt)
-
-
-async def write_essay(topic: str, template: str = None) -> str:
-    if template:
-        prompt = f"Напиши качественное, грамотное сочинение на тему: '{topic}'. Используй следующую структуру и рекомендации:\n{template}\n\nСочинение должно быть логичным, аргументированным и стилистически выверенным."
-    else:
-        prompt = f"Напиши качественное сочинение на тему: '{topic}'. Сочинение должно иметь четкую структуру: введение с тезисом, основную часть с 2-3 аргументами и примерами, заключение с выводами. Используй литературный русский язык, избегай штампов и клише."
-
-    return await generate_text(prompt)
\ No newline at end of file
+check_cache = CheckCache(settings.CHECK_CACHE_SIZE, settings.CHECK_CACHE_TTL, settings.CHECK_CACHE_DB_TTL)
+single_flight = SingleFlight()
+
+
+async def generate_text(prompt: Prompt) -> str:
+    return await single_flight.do(
+        fingerprint(f"{prompt.max_tokens}:{prompt.text}"),
+        lambda: ai_client.aask(prompt.text, prompt.max_tokens, prompt.task)
+    )
+
+
+async def accumulate_stream(prompt: Prompt):
+    text = ""
+    async for chunk in ai_client.astream(prompt.text, prompt.max_tokens, prompt.task):
+        text += chunk
+        yield text
+
+
+def stream_text(prompt: Prompt):
+    return single_flight.stream(
+        fingerprint(f"{prompt.max_tokens}:{prompt.text}"),
+        lambda: accumulate_stream(prompt)
+    )
+
+
+async def stream_chunked_check(text: str, known: str = ""):
+    # Ошибки ищутся по кускам параллельно, композиция и содержание - одним запросом по всему тексту
+    chunks = split_into_chunks(text, settings.CHECK_CHUNK_SIZE, settings.CHECK_CHUNK_OVERLAP)
+    fragments = {
+        asyncio.ensure_future(generate_text(build_fragment_prompt(chunk, known))): i
+        for i, chunk in enumerate(chunks)
+    }
+    composition_task = asyncio.ensure_future(
+        generate_text(build_composition_prompt(text))
+    )
+
+    answers = [""] * len(chunks)
+    composition = ""
+    pending = set(fragments) | {composition_task}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is composition_task:
+                    composition = task.result()
+                else:
+                    answers[fragments[task]] = task.result()
+            yield build_report(merge_findings(answers), composition, len(pending - {composition_task}))
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def stream_check_source(text: str, findings: list[str] = None):
+    # Замечания локальной проверки обычно уже посчитаны обработчиком, чтобы показать их сразу
+    if findings is None:
+        findings = pre_checker.check(text)
+    known = format_known(findings)
+    if len(text) > settings.CHECK_CHUNK_THRESHOLD:
+        return stream_chunked_check(text, known)
+    return stream_text(build_check_prompt(text, known))
+
+
+async def cached_check(text: str):
+    return await check_cache.get(make_key(text, CHECK_VERSION))
+
+
+async def stream_fresh_check(text: str, findings: list[str] = None):
+    # Проверка без обращения к кэшу: вызывающий код уже убедился, что готового ответа нет
+    answer = ""
+    async for answer in stream_check_source(text, findings):
+        yield answer
+    if answer:
+        await check_cache.set(make_key(text, CHECK_VERSION), answer)
+
+
+def stream_write_essay(topic: str, template: str = None):
+    return stream_text(build_essay_prompt(topic, template))
@@ -1,6 +1,11 @@
+import asyncio
 from gigachat import GigaChat
 from gigachat.models import Chat, Messages, MessagesRole
-from config.settings import settings
+from ai.prompts import token_estimator
+from config.settings import settings, per_process
+from metrics import metrics
+
+DEFAULT_MAX_TOKENS = 800
 
 
 class GigaChatt:
@@ -8,10 +13,15 @@ class GigaChatt:
         self.client = GigaChat(
             credentials=settings.GIGACHAT_KEY,
             scope="GIGACHAT_API_PERS",
-            verify_ssl_certs=False
+            verify_ssl_certs=False,
+            timeout=settings.GIGACHAT_TIMEOUT,
+            max_connections=per_process(settings.GIGACHAT_MAX_CONNECTIONS)
         )
+        self.semaphore = asyncio.Semaphore(per_process(settings.GIGACHAT_CONCURRENCY))
+        self.usage = {}
+        self.in_flight = 0
 
-    def ask(self, prompt: str) -> str:
+    def build_chat(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Chat:
         messages = [
             Messages(
                 role=MessagesRole.USER,
@@ -19,11 +29,68 @@ class GigaChatt:
             )
         ]
 
-        response = self.client.chat(
-            Chat(
-                messages=messages,
-                max_tokens=800
-            )
+        return Chat(
+            messages=messages,
+            max_tokens=max_tokens
         )
 
-        return response.choices[0].message.content
\ No newline at end of file
+    def record(self, task: str, prompt: str, answer: str, max_tokens: int, usage, finish_reason: str):
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+            token_estimator.calibrate(prompt, prompt_tokens)
+        else:
+            prompt_tokens, completion_tokens = token_estimator.estimate(prompt), token_estimator.estimate(answer)
+
+        truncated = finish_reason == "length"
+        totals = self.usage.setdefault(task, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "truncated": 0})
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        totals["truncated"] += truncated
+        metrics.inc("llm_tokens_total", prompt_tokens, task=task, kind="prompt")
+        metrics.inc("llm_tokens_total", completion_tokens, task=task, kind="completion")
+        if truncated:
+            metrics.inc("llm_truncated_total", task=task)
+
+        print(f"GigaChat [{task}]: промпт {prompt_tokens} ток., ответ {completion_tokens} из {max_tokens}" + (" - ответ обрезан" if truncated else ""))
+
+    def ask(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, task: str = "chat") -> str:
+        response = self.client.chat(self.build_chat(prompt, max_tokens))
+        answer = response.choices[0].message.content
+        self.record(task, prompt, answer, max_tokens, response.usage, response.choices[0].finish_reason)
+
+        return answer
+
+    async def aask(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, task: str = "chat") -> str:
+        # Асинхронный клиент держит пул HTTP-соединений, семафор ограничивает число одновременных запросов
+        async with self.semaphore, metrics.timer("llm_request_seconds", task=task):
+            self.in_flight += 1
+            try:
+                response = await self.client.achat(self.build_chat(prompt, max_tokens))
+            finally:
+                self.in_flight -= 1
+        answer = response.choices[0].message.content
+        self.record(task, prompt, answer, max_tokens, response.usage, response.choices[0].finish_reason)
+
+        return answer
+
+    async def astream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, task: str = "chat"):
+        answer = ""
+        usage = None
+        finish_reason = None
+        async with self.semaphore, metrics.timer("llm_request_seconds", task=task):
+            self.in_flight += 1
+            try:
+                async for chunk in self.client.astream(self.build_chat(prompt, max_tokens)):
+                    usage = chunk.usage or usage
+                    if chunk.choices and chunk.choices[0].finish_reason:
+                        finish_reason = chunk.choices[0].finish_reason
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        answer += chunk.choices[0].delta.content
+                        yield chunk.choices[0].delta.content
+            finally:
+                self.in_flight -= 1
+        self.record(task, prompt, answer, max_tokens, usage, finish_reason)
+
+    async def close(self):
+        await self.client.aclose()
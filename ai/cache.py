@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from database.db_session import create_async_session
+from database.models import CheckResult
+from database.writer import writer
+
+PURGE_INTERVAL = 3600
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFC", text)
+    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def make_key(text: str, version: int) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"v{version}:{digest}"
+
+
+class CheckCache:
+    """Кэш результатов проверки: LRU в памяти с TTL поверх таблицы check_results.
+
+    Фоновая задача раз в PURGE_INTERVAL секунд удаляет из таблицы записи старше db_ttl.
+    """
+
+    def __init__(self, max_size: int, ttl: int, db_ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_ttl = db_ttl
+        self.items = OrderedDict()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def get(self, key: str):
+        item = self.items.get(key)
+        if item is not None:
+            answer, expires_at = item
+            if expires_at > time.monotonic():
+                self.items.move_to_end(key)
+                self.hits += 1
+                return answer
+            del self.items[key]
+
+        async with create_async_session() as session:
+            row = await session.get(CheckResult, key)
+
+        if row and row.created_at > datetime.utcnow() - timedelta(seconds=self.db_ttl):
+            self._remember(key, row.answer)
+            self.hits += 1
+            self.db_hits += 1
+            return row.answer
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, answer: str):
+        self._remember(key, answer)
+
+        writer.add(CheckResult(key=key, answer=answer, created_at=datetime.utcnow()))
+
+    def _remember(self, key: str, answer: str):
+        self.items[key] = (answer, time.monotonic() + self.ttl)
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    async def purge(self) -> int:
+        async with create_async_session() as session:
+            result = await session.execute(
+                delete(CheckResult).where(CheckResult.created_at < datetime.utcnow() - timedelta(seconds=self.db_ttl))
+            )
+            await session.commit()
+        return result.rowcount
+
+    async def _run(self):
+        while True:
+            try:
+                removed = await self.purge()
+                if removed:
+                    print(f"Удалено устаревших результатов проверки: {removed}")
+            except Exception as e:
+                print("Ошибка очистки кэша проверок:", e)
+            await asyncio.sleep(PURGE_INTERVAL)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.items),
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
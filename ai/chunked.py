@@ -0,0 +1,81 @@
+import re
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+FINDING_NOISE = re.compile(r"[\W_]+")
+
+
+def split_sentences(text: str) -> list[str]:
+    sentences = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            sentences.extend(sentence for sentence in SENTENCE_END.split(paragraph) if sentence)
+            sentences.append("\n")
+    return sentences[:-1]
+
+
+def split_into_chunks(text: str, max_chars: int, overlap: int = 1) -> list[str]:
+    """Делит текст на куски по границам предложений.
+
+    Каждый следующий кусок начинается с overlap последних предложений предыдущего,
+    чтобы ошибки на стыке не терялись.
+    """
+    chunks = []
+    current = []
+    size = 0
+
+    for sentence in split_sentences(text):
+        if current and size + len(sentence) > max_chars:
+            chunks.append(current)
+            current = [s for s in current[-overlap:] if s != "\n"] if overlap else []
+            size = sum(len(s) for s in current)
+        current.append(sentence)
+        size += len(sentence) + 1
+
+    if current:
+        chunks.append(current)
+
+    return [join_sentences(chunk) for chunk in chunks]
+
+
+def join_sentences(sentences: list[str]) -> str:
+    text = ""
+    for sentence in sentences:
+        if sentence == "\n":
+            text += "\n\n"
+        elif text and not text.endswith("\n"):
+            text += " " + sentence
+        else:
+            text += sentence
+    return text.strip()
+
+
+def parse_findings(answer: str) -> list[str]:
+    return [line.strip() for line in answer.splitlines() if line.strip().startswith(("-", "•", "*"))]
+
+
+def merge_findings(answers: list[str]) -> list[str]:
+    # Из-за перекрытия кусков одна и та же ошибка может найтись дважды
+    seen = set()
+    findings = []
+    for answer in answers:
+        for finding in parse_findings(answer):
+            key = FINDING_NOISE.sub("", finding.lower())
+            if key and key not in seen:
+                seen.add(key)
+                findings.append(finding)
+    return findings
+
+
+def build_report(findings: list[str], composition: str, pending: int = 0) -> str:
+    report = "Орфография, пунктуация и грамматика:\n"
+    if findings:
+        report += "\n".join(findings)
+    elif not pending:
+        report += "Ошибок не найдено."
+    if pending:
+        report += f"\n(проверяется фрагментов: {pending})"
+
+    if composition:
+        report += "\n\n" + composition
+    return report
@@ -0,0 +1,217 @@
+import os
+import re
+from config.settings import settings
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+WORD = re.compile(r"[А-Яа-яЁё]+(?:-[А-Яа-яЁё]+)*")
+REPEATED_WORD = re.compile(r"\b([А-Яа-яЁё]+)\s+\1\b", re.IGNORECASE)
+SENTENCE = re.compile(r"[^.!?…]+[.!?…]*")
+
+# Исключения сверяются со словом прямо перед совпадением
+# Для союзов: при этих словах запятая не нужна
+CONJUNCTION_EXCEPTIONS = {"не", "ни", "и", "или", "да", "то", "так", "потому", "лишь", "только", "всё", "все", "при", "для", "с", "в"}
+# Сокращения с точкой, после которых предложение продолжается со строчной буквы: «и т. д.», «в 1825 г.»
+ABBREVIATIONS = {
+    "т", "д", "п", "е", "н", "г", "гг", "в", "вв", "др", "пр", "проч", "см", "ср", "стр", "с", "им",
+    "напр", "тыс", "млн", "млрд", "руб", "коп", "ок", "ст", "гл", "рис", "табл", "э",
+}
+
+PUNCTUATION_RULES = [
+    (re.compile(r"[А-Яа-яЁё]\s+[,.!?;:](?!\.)"), "лишний пробел перед знаком препинания", None),
+    (re.compile(r"[,;:](?=[А-Яа-яЁё])"), "нет пробела после знака препинания", None),
+    (re.compile(r"[а-яё][.!?](?=[А-ЯЁ])"), "нет пробела после конца предложения", None),
+    (re.compile(r",{2,}|(?<!\.)\.\.(?!\.)|[!?]{4,}"), "повторяющиеся знаки препинания", None),
+    (re.compile(r"(?<!\.\.)[.!?](?=\s+[а-яё])"), "предложение начинается со строчной буквы", ABBREVIATIONS),
+    (
+        re.compile(r"(?<=[А-Яа-яЁё])\s(?:а|но|однако|зато)\s(?=[а-яё])"),
+        "перед союзами «а», «но», «однако», «зато» ставится запятая",
+        CONJUNCTION_EXCEPTIONS,
+    ),
+    (
+        re.compile(r"(?<=[А-Яа-яЁё])\s(?:что|чтобы|котор(?:ый|ая|ое|ые|ого|ой|ых|ым|ому|ую|ыми))\s"),
+        "придаточная часть с «что», «чтобы», «который» обычно отделяется запятой",
+        CONJUNCTION_EXCEPTIONS,
+    ),
+]
+
+TAUTOLOGY_STOPWORDS = {
+    "котор", "чтобы", "потом", "также", "может", "этого", "этому", "своег", "своей", "своих",
+    "можно", "нужно", "очень", "когда", "тогда", "всего", "всегд", "перед", "после", "между",
+}
+
+
+class Trie:
+    """Префиксное дерево со сжатыми ребрами: цепочки без ветвлений хранятся одной строкой."""
+
+    EMPTY = object()
+
+    def __init__(self):
+        self.root = [Trie.EMPTY, {}]
+        self.size = 0
+
+    def insert(self, word: str, value=True):
+        node = self.root
+        i = 0
+        while True:
+            if i == len(word):
+                if node[0] is Trie.EMPTY:
+                    self.size += 1
+                node[0] = value
+                return
+
+            edge = node[1].get(word[i])
+            if edge is None:
+                node[1][word[i]] = (word[i:], [value, {}])
+                self.size += 1
+                return
+
+            label, child = edge
+            common = 0
+            limit = min(len(label), len(word) - i)
+            while common < limit and label[common] == word[i + common]:
+                common += 1
+
+            if common < len(label):
+                middle = [Trie.EMPTY, {label[common]: (label[common:], child)}]
+                node[1][word[i]] = (label[:common], middle)
+                child = middle
+
+            node = child
+            i += common
+
+    def get(self, word: str, default=None):
+        node = self.root
+        i = 0
+        while i < len(word):
+            edge = node[1].get(word[i])
+            if edge is None or not word.startswith(edge[0], i):
+                return default
+            i += len(edge[0])
+            node = edge[1]
+        return default if node[0] is Trie.EMPTY else node[0]
+
+    def __contains__(self, word: str) -> bool:
+        return self.get(word, Trie.EMPTY) is not Trie.EMPTY
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def normalize_word(word: str) -> str:
+    return word.lower().replace("ё", "е")
+
+
+def load_misspellings(path: str) -> Trie:
+    trie = Trie()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                wrong, right = line.split("=", 1)
+                trie.insert(normalize_word(wrong), right)
+    return trie
+
+
+def load_dictionary(path: str) -> Trie:
+    trie = Trie()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            word = line.strip()
+            if word:
+                trie.insert(normalize_word(word))
+    return trie
+
+
+class PreChecker:
+    """Быстрая локальная проверка: словарь, простые правила пунктуации, повторы и тавтология."""
+
+    def __init__(self, misspellings: Trie, dictionary: Trie = None):
+        self.misspellings = misspellings
+        self.dictionary = dictionary
+
+    def check(self, text: str) -> list[str]:
+        # Одинаковые замечания к одному и тому же месту показываем один раз
+        return list(dict.fromkeys(self.check_spelling(text) + self.check_punctuation(text) + self.check_repeats(text)))
+
+    def check_spelling(self, text: str) -> list[str]:
+        findings = []
+        seen = set()
+        for match in WORD.finditer(text):
+            word = match.group()
+            key = normalize_word(word)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            right = self.misspellings.get(key)
+            if right is not None:
+                findings.append(f"- [Орфография] «{word}» → «{right}»")
+            elif self.dictionary is not None and len(key) > 2 and key not in self.dictionary:
+                findings.append(f"- [Орфография] «{word}»: слова нет в словаре, проверьте написание")
+        return findings
+
+    def check_punctuation(self, text: str) -> list[str]:
+        findings = []
+        for pattern, rule, exceptions in PUNCTUATION_RULES:
+            for match in pattern.finditer(text):
+                if exceptions and word_before(text, match.start()).lower() in exceptions:
+                    continue
+                fragment = context(text, match.start(), match.end())
+                findings.append(f"- [Пунктуация] «{fragment}»: {rule}")
+        return findings
+
+    def check_repeats(self, text: str) -> list[str]:
+        findings = []
+        for match in REPEATED_WORD.finditer(text):
+            findings.append(f"- [Стилистика] «{match.group()}»: слово повторено подряд")
+
+        for sentence in SENTENCE.findall(text):
+            stems = {}
+            for match in WORD.finditer(sentence):
+                word = normalize_word(match.group())
+                if len(word) < 6:
+                    continue
+                stem = word[:5]
+                if stem in TAUTOLOGY_STOPWORDS:
+                    continue
+                if stem in stems and stems[stem] != word:
+                    findings.append(f"- [Стилистика] «{stems[stem]}» … «{word}»: возможна тавтология")
+                    stems[stem] = word
+                else:
+                    stems.setdefault(stem, word)
+        return findings
+
+
+def word_before(text: str, end: int) -> str:
+    start = end
+    while start > 0 and text[start - 1].isalpha():
+        start -= 1
+    return text[start:end]
+
+
+def context(text: str, start: int, end: int, width: int = 15) -> str:
+    left = max(text.rfind(" ", 0, max(start - width, 0)) + 1, 0)
+    right = text.find(" ", min(end + width, len(text)))
+    if right == -1:
+        right = len(text)
+    return " ".join(text[left:right].split())
+
+
+def format_findings(findings: list[str], limit: int = 30) -> str:
+    text = "Быстрая проверка:\n" + "\n".join(findings[:limit])
+    if len(findings) > limit:
+        text += f"\n…и еще {len(findings) - limit}"
+    return text
+
+
+def format_known(findings: list[str]) -> str:
+    if not findings:
+        return ""
+    return "\n\nЭти замечания уже найдены автоматически, не повторяй их и ищи остальные:\n" + "\n".join(findings)
+
+
+pre_checker = PreChecker(
+    load_misspellings(os.path.join(DATA_DIR, "misspellings.txt")),
+    load_dictionary(settings.PRECHECK_DICTIONARY) if settings.PRECHECK_DICTIONARY else None
+)
@@ -0,0 +1,227 @@
+import math
+import re
+from string import Formatter
+from typing import NamedTuple
+from config.settings import settings
+
+TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+WORD_CHARS_PER_TOKEN = 4
+TRIM_MARK = " […]"
+
+
+class TokenEstimator:
+    """Приблизительный подсчет токенов без обращения к API.
+
+    Слово дает примерно один токен на каждые WORD_CHARS_PER_TOKEN символов, знак препинания - один токен.
+    Поправочный коэффициент подстраивается по реальным числам, которые возвращает модель.
+    """
+
+    def __init__(self):
+        self.ratio = 1.0
+
+    def raw(self, text: str) -> int:
+        tokens = 0
+        for piece in TOKEN_PIECE.findall(text):
+            tokens += math.ceil(len(piece) / WORD_CHARS_PER_TOKEN)
+        return tokens
+
+    def estimate(self, text: str) -> int:
+        return math.ceil(self.raw(text) * self.ratio)
+
+    def calibrate(self, text: str, actual: int):
+        raw = self.raw(text)
+        if raw and actual:
+            self.ratio = 0.9 * self.ratio + 0.1 * (actual / raw)
+
+
+token_estimator = TokenEstimator()
+
+
+def estimate_tokens(text: str) -> int:
+    return token_estimator.estimate(text)
+
+
+def trim_to_tokens(text: str, budget: int) -> str:
+    """Обрезает текст до бюджета токенов, по возможности по границе строки или предложения."""
+    if estimate_tokens(text) <= budget:
+        return text
+    if budget <= 0:
+        return ""
+
+    # Бинарный поиск длины префикса, который помещается в бюджет
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+
+    cut = text[:low]
+    boundary = max(cut.rfind("\n"), cut.rfind(". "))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + TRIM_MARK
+
+
+class Prompt(NamedTuple):
+    text: str
+    max_tokens: int
+    task: str
+
+
+class PromptTemplate:
+    """Версионированный шаблон промпта.
+
+    Шаблон разбирается один раз при импорте: известны его поля и размер постоянной части в токенах.
+    max_tokens выбирается по задаче: base плюс per_input на каждый токен входного текста, но не больше limit.
+    """
+
+    def __init__(self, task: str, version: int, text: str, base: int, per_input: float, limit: int):
+        self.task = task
+        self.version = version
+        self.text = text
+        self.base = base
+        self.per_input = per_input
+        self.limit = limit
+        self.fields = [field for _, field, _, _ in Formatter().parse(text) if field]
+        self.static_tokens = estimate_tokens(text.format_map({field: "" for field in self.fields}))
+
+    def max_tokens(self, input_tokens: int) -> int:
+        return min(self.limit, self.base + int(self.per_input * input_tokens))
+
+    def input_budget(self, max_tokens: int) -> int:
+        return settings.GIGACHAT_CONTEXT_TOKENS - max_tokens - self.static_tokens
+
+    def render(self, main: str, **values) -> Prompt:
+        """main - поле с основным текстом: по нему считается max_tokens, и только оно обрезается под контекст."""
+        values = {field: values.get(field, "") for field in self.fields if field != main} | {main: values[main]}
+        input_tokens = sum(estimate_tokens(value) for value in values.values())
+        max_tokens = self.max_tokens(input_tokens)
+
+        other_tokens = input_tokens - estimate_tokens(values[main])
+        values[main] = trim_to_tokens(values[main], self.input_budget(max_tokens) - other_tokens)
+        return Prompt(self.text.format_map(values), max_tokens, self.task)
+
+
+CHECK = PromptTemplate("check", 3, """Ты - опытный преподаватель русского языка и литературы. Проведи комплексную проверку сочинения и дай развернутый анализ:
+
+1. Орфография:
+   - Найдите и исправьте орфографические ошибки
+   - Укажите правило для каждой ошибки
+
+2. Пунктуация:
+   - Проверьте расстановку знаков препинания
+   - Исправьте ошибки, объясните правила
+
+3. Грамматика:
+   - Проверьте согласование, управление, примыкание
+   - Исправьте грамматические ошибки
+
+4. Стилистика:
+   - Оцените уместность лексики
+   - Отметьте речевые ошибки (тавтология, плеоназм, канцеляризмы)
+   - Проверьте стилистическое единство
+
+5. Логика и композиция:
+   - Оцените логическую связность
+   - Проверьте структуру (введение, основная часть, заключение)
+   - Отметьте нарушения последовательности
+
+6. Содержание:
+   - Оцените раскрытие темы
+   - Проверьте аргументацию
+   - Оцените глубину анализа
+
+7. Общие рекомендации:
+   - Дайте конкретные рекомендации по улучшению
+   - Предложите альтернативные формулировки
+   - Укажите сильные стороны работы
+
+8. Оценка (по 10-балльной шкале):
+   - Орфография и пунктуация: [оценка]
+   - Грамматика и стилистика: [оценка]
+   - Логика и композиция: [оценка]
+   - Содержание: [оценка]
+   - ИТОГОВАЯ ОЦЕНКА: [оценка]
+
+Сочинение для проверки:
+{text}
+
+Предоставь ответ в структурированном виде с выделением ошибок и объяснениями.{known}""", base=700, per_input=1.0, limit=2000)
+
+FRAGMENT = PromptTemplate("fragment", 1, """Ты - опытный преподаватель русского языка. Ниже фрагмент сочинения.
+Найди в нем только орфографические, пунктуационные и грамматические ошибки.
+
+Выведи каждую ошибку отдельной строкой в формате:
+- [раздел] ошибка → исправление (правило)
+
+где раздел - одно из слов: Орфография, Пунктуация, Грамматика.
+Если ошибок нет, ничего не выводи. Не оценивай стиль и содержание.{known}
+
+Фрагмент:
+{fragment}""", base=150, per_input=0.6, limit=800)
+
+COMPOSITION = PromptTemplate("composition", 1, """Ты - опытный преподаватель русского языка и литературы. Оцени сочинение целиком.
+Орфографию, пунктуацию и грамматику не проверяй - это делается отдельно.
+
+1. Стилистика:
+   - Оцените уместность лексики
+   - Отметьте речевые ошибки (тавтология, плеоназм, канцеляризмы)
+   - Проверьте стилистическое единство
+
+2. Логика и композиция:
+   - Оцените логическую связность
+   - Проверьте структуру (введение, основная часть, заключение)
+   - Отметьте нарушения последовательности
+
+3. Содержание:
+   - Оцените раскрытие темы
+   - Проверьте аргументацию
+   - Оцените глубину анализа
+
+4. Общие рекомендации:
+   - Дайте конкретные рекомендации по улучшению
+   - Укажите сильные стороны работы
+
+5. Оценка (по 10-балльной шкале):
+   - Логика и композиция: [оценка]
+   - Содержание: [оценка]
+   - Грамматика и стилистика: [оценка]
+
+Сочинение:
+{text}""", base=700, per_input=0.2, limit=1500)
+
+ESSAY = PromptTemplate(
+    "essay", 1,
+    "Напиши качественное сочинение на тему: '{topic}'. Сочинение должно иметь четкую структуру: введение с тезисом, основную часть с 2-3 аргументами и примерами, заключение с выводами. Используй литературный русский язык, избегай штампов и клише.",
+    base=1200, per_input=0, limit=1200
+)
+
+ESSAY_WITH_TEMPLATE = PromptTemplate(
+    "essay", 1,
+    "Напиши качественное, грамотное сочинение на тему: '{topic}'. Используй следующую структуру и рекомендации:\n{template}\n\nСочинение должно быть логичным, аргументированным и стилистически выверенным.",
+    base=1100, per_input=0.5, limit=1800
+)
+
+# Версия входит в ключ кэша проверок: при изменении любого из шаблонов старые ответы не используются
+CHECK_VERSION = f"{CHECK.version}.{FRAGMENT.version}.{COMPOSITION.version}"
+
+
+def build_check_prompt(text: str, known: str = "") -> Prompt:
+    return CHECK.render("text", text=text, known=trim_to_tokens(known, settings.PROMPT_KNOWN_TOKENS))
+
+
+def build_fragment_prompt(fragment: str, known: str = "") -> Prompt:
+    return FRAGMENT.render("fragment", fragment=fragment, known=trim_to_tokens(known, settings.PROMPT_KNOWN_TOKENS))
+
+
+def build_composition_prompt(text: str) -> Prompt:
+    return COMPOSITION.render("text", text=text)
+
+
+def build_essay_prompt(topic: str, template: str = None) -> Prompt:
+    topic = trim_to_tokens(topic, settings.PROMPT_TOPIC_TOKENS)
+    if template:
+        return ESSAY_WITH_TEMPLATE.render("template", topic=topic, template=trim_to_tokens(template, settings.PROMPT_TEMPLATE_TOKENS))
+    return ESSAY.render("topic", topic=topic)
@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import OrderedDict, deque
+from config.settings import settings, per_process
+from metrics import metrics
+
+PRIORITY_CHECK = 0
+PRIORITY_WRITE = 1
+
+DEFAULT_DURATION = {
+    PRIORITY_CHECK: 20.0,
+    PRIORITY_WRITE: 40.0,
+}
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, scheduler, job_id: int, user_id: int, priority: int, factory):
+        self.scheduler = scheduler
+        self.id = job_id
+        self.user_id = user_id
+        self.priority = priority
+        self.factory = factory
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+    @property
+    def started(self) -> bool:
+        return self.started_at is not None
+
+    def position(self) -> int:
+        return self.scheduler.position(self)
+
+    def eta(self) -> int:
+        return self.scheduler.eta(self)
+
+    async def result(self):
+        return await asyncio.shield(self.future)
+
+
+class Scheduler:
+    """Очередь запросов к модели с ограниченным числом исполнителей.
+
+    Задачи разложены по приоритетам, внутри приоритета - по пользователям,
+    которые обслуживаются по кругу, чтобы один пользователь не занимал всю очередь.
+    """
+
+    def __init__(self, workers: int, max_queue: int, max_user_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_user_queue = max_user_queue
+        self.queues = {priority: OrderedDict() for priority in DEFAULT_DURATION}
+        self.durations = dict(DEFAULT_DURATION)
+        self.size = 0
+        self.running = 0
+        self.ids = itertools.count(1)
+        self.tasks = []
+        self.ready = asyncio.Semaphore(0)
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit(self, user_id: int, priority: int, factory) -> Job:
+        if self.size >= self.max_queue:
+            raise QueueFull()
+
+        user_jobs = self.queues[priority].get(user_id)
+        pending = sum(len(queue.get(user_id, ())) for queue in self.queues.values())
+        if pending >= self.max_user_queue:
+            raise QueueFull()
+
+        job = Job(self, next(self.ids), user_id, priority, factory)
+        if user_jobs is None:
+            user_jobs = self.queues[priority][user_id] = deque()
+        user_jobs.append(job)
+        self.size += 1
+
+        self.ready.release()
+        return job
+
+    def position(self, job: Job) -> int:
+        if job.started:
+            return 0
+
+        ahead = 0
+        for priority, queue in self.queues.items():
+            if priority < job.priority:
+                ahead += sum(len(jobs) for jobs in queue.values())
+            elif priority == job.priority:
+                jobs = queue.get(job.user_id)
+                if jobs is None or job not in jobs:
+                    return 0
+                index = jobs.index(job)
+                before = True
+                for user_id, other in queue.items():
+                    if user_id == job.user_id:
+                        before = False
+                        ahead += index
+                    else:
+                        ahead += min(len(other), index + (1 if before else 0))
+
+        return ahead + 1
+
+    def eta(self, job: Job) -> int:
+        position = self.position(job)
+        if position == 0:
+            return 0
+        rounds = math.ceil((position + self.running) / self.workers)
+        return math.ceil(rounds * self.durations[job.priority])
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.size,
+            "running": self.running,
+            "workers": self.workers,
+            "durations": dict(self.durations),
+        }
+
+    def _take(self):
+        for queue in self.queues.values():
+            if not queue:
+                continue
+            user_id, jobs = next(iter(queue.items()))
+            job = jobs.popleft()
+            del queue[user_id]
+            if jobs:
+                queue[user_id] = jobs
+            self.size -= 1
+            return job
+        return None
+
+    async def _worker(self):
+        while True:
+            await self.ready.acquire()
+            job = self._take()
+
+            job.started_at = time.monotonic()
+            metrics.observe("scheduler_wait_seconds", job.started_at - job.enqueued_at, priority=job.priority)
+            self.running += 1
+            try:
+                job.future.set_result(await job.factory())
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                job.future.set_exception(e)
+            finally:
+                self.running -= 1
+                duration = time.monotonic() - job.started_at
+                self.durations[job.priority] = 0.8 * self.durations[job.priority] + 0.2 * duration
+
+
+scheduler = Scheduler(per_process(settings.SCHEDULER_WORKERS), settings.SCHEDULER_QUEUE_SIZE, settings.SCHEDULER_USER_QUEUE_SIZE)
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+
+
+def fingerprint(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class SharedStream:
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Condition()
+        self.task = None
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые запросы в один вызов модели.
+
+    Первый вызов с данным ключом выполняет запрос, остальные ждут его результат.
+    Для потоков каждый подписчик получает текущий накопленный текст.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.streams = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, factory):
+        shared = self.streams.get(key)
+        if shared is None:
+            shared = SharedStream()
+            self.streams[key] = shared
+            shared.task = asyncio.ensure_future(self._pump(key, shared, factory()))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        shown = ""
+        while True:
+            async with shared.changed:
+                await shared.changed.wait_for(lambda: shared.text != shown or shared.done)
+                text, done, error = shared.text, shared.done, shared.error
+
+            if error is not None:
+                raise error
+            if text != shown:
+                shown = text
+                yield text
+            if done:
+                return
+
+    async def _pump(self, key: str, shared: SharedStream, chunks):
+        try:
+            async for text in chunks:
+                async with shared.changed:
+                    shared.text = text
+                    shared.changed.notify_all()
+        except Exception as e:
+            shared.error = e
+        finally:
+            self.streams.pop(key, None)
+            async with shared.changed:
+                shared.done = True
+                shared.changed.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self.calls) + len(self.streams),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,74 @@
+"""Сравнение пропускной способности движков базы данных.
+
+Запуск: python -m benchmarks.db_engine [URL сервера БД ...]
+
+Для каждого профиля создается чистая база, затем измеряются
+вставки по одной строке с коммитом, пачечные вставки и чтение страниц истории.
+Сервер БД должен указывать на пустую тестовую базу: таблицы в ней пересоздаются.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from database.db_session import SqlAlchemyBase, create_engines
+from database.models import Essay
+from database.repository import get_essay_page
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+ROWS = 2000
+BATCH = 50
+PAGES = 2000
+USERS = 20
+
+
+async def run_profile(name: str, url: str, pragmas: dict = None):
+    engine, async_engine = create_engines(url, pragmas)
+    SqlAlchemyBase.metadata.drop_all(engine)
+    SqlAlchemyBase.metadata.create_all(engine)
+    factory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    start = time.perf_counter()
+    for i in range(ROWS // 4):
+        async with factory() as session:
+            session.add(Essay(user_id=i % USERS, topic=f"Тема {i}", content="Текст сочинения. " * 50))
+            await session.commit()
+    single = (ROWS // 4) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, ROWS, BATCH):
+        async with factory() as session:
+            session.add_all([
+                Essay(user_id=j % USERS, topic=f"Тема {j}", content="Текст сочинения. " * 50)
+                for j in range(i, i + BATCH)
+            ])
+            await session.commit()
+    batched = ROWS / (time.perf_counter() - start)
+
+    async def read_pages(count: int):
+        for i in range(count):
+            async with factory() as session:
+                await get_essay_page(session, i % USERS, None, 6)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[read_pages(PAGES // 10) for _ in range(10)])
+    pages = PAGES / (time.perf_counter() - start)
+
+    await async_engine.dispose()
+    engine.dispose()
+
+    print(f"{name:<16} {single:>12.0f} {batched:>12.0f} {pages:>12.0f}")
+
+
+async def main():
+    print(f"{'профиль':<16} {'вставка/с':>12} {'пачка/с':>12} {'страниц/с':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        await run_profile("sqlite", f"sqlite:///{os.path.join(tmp, 'plain.db')}", {})
+        await run_profile("sqlite-tuned", f"sqlite:///{os.path.join(tmp, 'tuned.db')}")
+
+    for url in sys.argv[1:]:
+        await run_profile(url.split(":")[0], url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
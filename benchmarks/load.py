@@ -0,0 +1,246 @@
+"""Нагрузочный тест бота без сети.
+
+Запуск: python -m benchmarks.load [--users 50] [--rounds 2] [--latency 0.5] [--jitter 0.2] [--limits] [--verbose]
+
+Настоящий Dispatcher с роутером bott.handlers получает синтетические обновления
+через dp.feed_update. Запросы к Telegram обрабатывает заглушка сессии бота,
+GigaChat заменен имитацией с заданной задержкой и разбросом. База создается
+во временной папке. Каждый пользователь по кругу проходит сценарии
+/write, /check, /templates, /history и /search.
+
+Без --limits ограничения частоты отправки в Telegram (bott/delivery.py) не применяются,
+чтобы замер показывал скорость самого бота.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+os.environ.setdefault("BOT_TOKEN", "123456:offline-benchmark")
+os.environ.setdefault("GIGACHAT_KEY", "offline")
+os.environ["METRICS_PORT"] = "0"
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetMe
+from aiogram.types import Update, Message, CallbackQuery, Chat, User
+from ai.agent import ai_client
+from bott.bot import bot, dp
+from bott.delivery import delivery
+from database.db_session import global_init
+from metrics import metrics
+
+ESSAY = (
+    "Каждый человек хотя бы раз задумывался о том, что такое настоящая дружба. "
+    "Для одних это поддержка в трудную минуту, для других общие интересы. "
+) * 6
+
+
+class FakeSession(BaseSession):
+    """Сессия бота, которая отвечает на запросы сама, не обращаясь к Telegram."""
+
+    def __init__(self):
+        super().__init__()
+        self.message_ids = itertools.count(1)
+        self.requests = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests += 1
+        if isinstance(method, GetMe):
+            return User(id=1, is_bot=True, first_name="Бот", username="essay_bot")
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not hasattr(method, "text"):
+            return True
+
+        return Message(
+            message_id=getattr(method, "message_id", None) or next(self.message_ids),
+            date=datetime.now(),
+            chat=Chat(id=chat_id, type="private"),
+            text=method.text
+        ).as_(bot)
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+class FakeGigaChat:
+    """Имитация клиента GigaChat: отвечает через latency ± jitter секунд."""
+
+    PIECES = 20
+
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def answer(self, chat) -> str:
+        prompt = chat.messages[0].content
+        return f"Ответ на запрос из {len(prompt)} символов. " + "Текст ответа модели. " * (chat.max_tokens // 10)
+
+    async def achat(self, chat):
+        await asyncio.sleep(self.delay())
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.answer(chat)), finish_reason="stop")],
+            usage=None
+        )
+
+    async def astream(self, chat):
+        text = self.answer(chat)
+        size = len(text) // self.PIECES + 1
+        pause = self.delay() / self.PIECES
+        for i in range(0, len(text), size):
+            await asyncio.sleep(pause)
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + size]), finish_reason=None)],
+                usage=None
+            )
+
+    async def aclose(self):
+        pass
+
+
+class Client:
+    """Синтетический пользователь: строит обновления и замеряет время их обработки."""
+
+    update_ids = itertools.count(1)
+
+    def __init__(self, user_id: int, latencies: dict):
+        self.user = User(id=user_id, is_bot=False, first_name=f"Пользователь {user_id}")
+        self.chat = Chat(id=user_id, type="private")
+        self.latencies = latencies
+        self.message_ids = itertools.count(1)
+
+    async def feed(self, kind: str, update: Update):
+        start = time.perf_counter()
+        await dp.feed_update(bot, update)
+        self.latencies.setdefault(kind, []).append(time.perf_counter() - start)
+
+    async def send(self, kind: str, text: str):
+        message = Message(
+            message_id=next(self.message_ids),
+            date=datetime.now(),
+            chat=self.chat,
+            from_user=self.user,
+            text=text
+        )
+        await self.feed(kind, Update(update_id=next(self.update_ids), message=message))
+
+    async def press(self, kind: str, data: str):
+        message = Message(message_id=next(self.message_ids), date=datetime.now(), chat=self.chat, text="...")
+        callback = CallbackQuery(
+            id=str(next(self.update_ids)),
+            from_user=self.user,
+            chat_instance=str(self.chat.id),
+            message=message,
+            data=data
+        )
+        await self.feed(kind, Update(update_id=next(self.update_ids), callback_query=callback))
+
+    async def run(self, rounds: int):
+        for i in range(rounds):
+            await self.send("/write", "/write")
+            await self.send("/write: тема", f"Дружба и предательство {self.user.id}-{i}")
+            await self.press("/write: шаблон", "use_default_template")
+
+            await self.send("/check", "/check")
+            await self.send("/check: текст", f"{ESSAY}\n\nСочинение {self.user.id}-{i}.")
+
+            await self.send("/templates", "/templates")
+            await self.press("/templates: новый", "create_template")
+            await self.send("/templates: название", f"Шаблон {i}")
+            await self.send("/templates: содержание", "1. Введение\n2. Аргументы\n3. Вывод")
+            await self.press("/templates: список", "show_templates")
+
+            await self.send("/history", "/history")
+            await self.press("/history: вперед", "history_next_0")
+
+            await self.send("/search", "/search дружба предательство")
+            await self.press("/search: вперед", "search_next_0")
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def db_queries() -> dict:
+    return {
+        labels[0][1]: histogram.count
+        for labels, histogram in metrics.histograms.get("db_query_seconds", {}).items()
+    }
+
+
+async def run(args):
+    from main import on_startup, on_shutdown
+
+    session = FakeSession()
+    if args.limits:
+        session.middleware(delivery)
+    bot.session = session
+    ai_client.client = FakeGigaChat(args.latency, args.jitter)
+
+    # Служебный вывод бота (журнал запросов к модели и т.п.) скрывается, если не указан --verbose
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with tempfile.TemporaryDirectory() as tmp, output:
+        global_init(f"sqlite:///{os.path.join(tmp, 'load.db')}")
+        await on_startup(register_commands=False, metrics_port=0)
+
+        latencies = {}
+        clients = [Client(100000 + i, latencies) for i in range(args.users)]
+        queries_before = db_queries()
+        memory_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        start = time.perf_counter()
+        await asyncio.gather(*[client.run(args.rounds) for client in clients])
+        elapsed = time.perf_counter() - start
+
+        await on_shutdown()
+
+    queries = {
+        statement: count - queries_before.get(statement, 0)
+        for statement, count in db_queries().items()
+    }
+    updates = sum(len(values) for values in latencies.values())
+    memory_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"Пользователей: {args.users}, кругов: {args.rounds}, задержка модели: {args.latency}±{args.jitter} с")
+    print(f"Обновлений: {updates} за {elapsed:.2f} с, {updates / elapsed:.1f} обновлений/с")
+    print(f"Запросов к Telegram: {session.requests}")
+    print()
+    print(f"{'шаг':<24}{'кол-во':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'макс, мс':>10}")
+    for kind, values in latencies.items():
+        print(
+            f"{kind:<24}{len(values):>8}{percentile(values, 0.5) * 1000:>10.1f}{percentile(values, 0.95) * 1000:>10.1f}"
+            f"{percentile(values, 0.99) * 1000:>10.1f}{max(values) * 1000:>10.1f}"
+        )
+    print()
+    print("Запросов к базе данных:", sum(queries.values()), "(" + ", ".join(f"{name}: {count}" for name, count in sorted(queries.items()) if count) + ")")
+    print(f"Пиковая память процесса: {memory_after / 1024:.1f} МБ (до нагрузки {memory_before / 1024:.1f} МБ)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бота без сети")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.5, help="средняя задержка ответа модели, с")
+    parser.add_argument("--jitter", type=float, default=0.2, help="разброс задержки модели, с")
+    parser.add_argument("--limits", action="store_true", help="включить ограничения частоты отправки в Telegram")
+    parser.add_argument("--verbose", action="store_true", help="показывать служебный вывод бота")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Скорость локальной предварительной проверки.
+
+Запуск: python -m benchmarks.precheck [папка с .txt сочинениями]
+
+По умолчанию используются образцы из benchmarks/corpus. Каждое сочинение
+проверяется несколько раз, затем то же самое повторяется для текста,
+склеенного из всех сочинений, чтобы оценить поведение на длинных работах.
+"""
+import glob
+import os
+import sys
+import time
+from ai.precheck import pre_checker
+
+REPEATS = 200
+LONG_COPIES = 20
+
+
+def measure(text: str, repeats: int) -> tuple:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        findings = pre_checker.check(text)
+    elapsed = (time.perf_counter() - start) / repeats
+    return elapsed, len(findings)
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "corpus")
+    essays = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.txt"))):
+        with open(path, encoding="utf-8") as file:
+            essays.append((os.path.basename(path), file.read()))
+
+    if not essays:
+        print("В папке нет сочинений:", folder)
+        return
+
+    print(f"{'сочинение':<20}{'символов':>10}{'замечаний':>11}{'мс':>9}{'символов/с':>14}")
+    for name, text in essays:
+        elapsed, found = measure(text, REPEATS)
+        print(f"{name:<20}{len(text):>10}{found:>11}{elapsed * 1000:>9.3f}{len(text) / elapsed:>14.0f}")
+
+    long_text = "\n\n".join(text for _, text in essays) * LONG_COPIES
+    elapsed, found = measure(long_text, REPEATS // 10)
+    print(f"{'все подряд x' + str(LONG_COPIES):<20}{len(long_text):>10}{found:>11}{elapsed * 1000:>9.3f}{len(long_text) / elapsed:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
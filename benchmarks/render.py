@@ -0,0 +1,70 @@
+"""Сравнение подготовки ответа модели к отправке: прежняя реализация и bott/render.py.
+
+Запуск: python -m benchmarks.render
+
+Прежняя реализация - нарезка по 4000 символов, новая - ленивое деление по границам
+абзацев и предложений. Отдельно сравнивается очистка разметки: цепочка replace
+против одного прохода str.translate по таблице.
+"""
+import time
+from bott.render import MAX_MESSAGE_LENGTH, clear_marks, split_message
+
+REPEATS = 200
+PARAGRAPH = (
+    "**1. Орфография:** в слове «агенство» пропущена буква - правильно «агентство» [правило: "
+    "непроизносимые согласные]. Также `вообщем` пишется как «в общем». Автор пишет: \"<цитата>\" & "
+    "делает вывод, что герой_прав. Пунктуация требует запятой перед союзом «а»!\n\n"
+)
+
+
+TRANSLATE_MARKS = str.maketrans({
+    "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;",
+    "*": None, "_": " ", "`": "'", "[": "(", "]": ")",
+})
+
+
+def translate_marks(text: str) -> str:
+    return text.translate(TRANSLATE_MARKS)
+
+
+def old_render(text: str) -> list:
+    text = clear_marks(text)
+    return [text[i:i + MAX_MESSAGE_LENGTH] for i in range(0, len(text), MAX_MESSAGE_LENGTH)]
+
+
+def new_render(text: str) -> list:
+    return list(split_message(clear_marks(text)))
+
+
+def measure(render, text: str) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        render(text)
+    return (time.perf_counter() - start) / REPEATS
+
+
+def broken(parts: list) -> int:
+    # Части, которые обрываются посреди слова или HTML-сущности
+    count = 0
+    for part in parts[:-1]:
+        tail = part[-8:]
+        if part[-1].isalnum() or ("&" in tail and ";" not in tail[tail.rfind("&"):]):
+            count += 1
+    return count
+
+
+def main():
+    print(f"{'символов':>10}{'replace, мс':>13}{'translate, мс':>15}{'нарезка, мс':>13}{'по границам, мс':>17}{'разрывов прежде/теперь':>25}")
+    for copies in (10, 100, 1000):
+        text = PARAGRAPH * copies
+        assert translate_marks(text) == clear_marks(text)
+        old_parts, new_parts = old_render(text), new_render(text)
+        print(
+            f"{len(text):>10}{measure(clear_marks, text) * 1000:>13.3f}{measure(translate_marks, text) * 1000:>15.3f}"
+            f"{measure(old_render, text) * 1000:>13.3f}{measure(new_render, text) * 1000:>17.3f}"
+            f"{broken(old_parts):>14}/{broken(new_parts)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, BotCommand
 from config.settings import settings
 from config.answers import REPLY_BUTTONS
+from bott.delivery import delivery
+from bott.storage import DatabaseStorage
 
 bot = Bot(token=settings.BOT_TOKEN)
-storage = MemoryStorage()
+bot.session.middleware(delivery)
+storage = DatabaseStorage()
 dp = Dispatcher(storage=storage)
 
 def main_board():
@@ -27,5 +29,7 @@ async def bot_commands():
         BotCommand(command="/check", description="Проверить сочинение"),
         BotCommand(command="/templates", description="Шаблоны сочинений"),
         BotCommand(command="/history", description="История сочинений"),
+        BotCommand(command="/search", description="Поиск по сочинениям и проверкам"),
+        BotCommand(command="/export", description="Скачать все сочинения архивом"),
     ]
     await bot.set_my_commands(commands)
\ No newline at end of file
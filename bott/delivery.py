@@ -0,0 +1,142 @@
+import asyncio
+import time
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from config.settings import settings
+
+MAX_CHATS = 10000
+
+
+class TokenBucket:
+    """Ведро токенов: rate запросов в секунду, допускается всплеск до capacity запросов.
+
+    reserve() сразу занимает токен и возвращает, сколько секунд нужно подождать до отправки.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        self.refill()
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def pause(self, seconds: float):
+        # Telegram попросил подождать: следующие токены появятся не раньше чем через seconds
+        self.refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def idle(self) -> bool:
+        self.refill()
+        return self.tokens >= self.capacity
+
+
+class ChatQueue:
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+
+
+class DeliveryMiddleware(BaseRequestMiddleware):
+    """Ограничивает исходящие запросы к Telegram.
+
+    Запросы в один чат выполняются строго по очереди и не чаще лимита чата,
+    все запросы вместе - не чаще общего лимита. На ответ 429 запрос повторяется
+    через указанное Telegram время retry_after.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, group_rate: float, burst: int, max_retries: int):
+        self.bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.chats = {}
+        self.sent = 0
+        self.throttled = 0
+        self.throttle_delay = 0.0
+        self.retries = 0
+        self.failed = 0
+
+    def chat(self, chat_id) -> ChatQueue:
+        queue = self.chats.get(chat_id)
+        if queue is None:
+            if len(self.chats) >= MAX_CHATS:
+                self.prune()
+            # У групп и каналов отрицательный id, для них Telegram ограничивает частоту строже
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = self.group_rate if is_group else self.chat_rate
+            queue = self.chats[chat_id] = ChatQueue(TokenBucket(rate, self.burst))
+        return queue
+
+    def prune(self):
+        for chat_id, queue in list(self.chats.items()):
+            if not queue.waiting and not queue.lock.locked() and queue.bucket.idle():
+                del self.chats[chat_id]
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        queue = self.chat(chat_id)
+        queue.waiting += 1
+        try:
+            async with queue.lock:
+                return await self.send(queue, make_request, bot, method)
+        finally:
+            queue.waiting -= 1
+
+    async def send(self, queue: ChatQueue, make_request, bot, method):
+        attempt = 0
+        while True:
+            delay = max(queue.bucket.reserve(), self.bucket.reserve())
+            if delay:
+                self.throttled += 1
+                self.throttle_delay += delay
+                await asyncio.sleep(delay)
+
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self.failed += 1
+                    raise
+                self.retries += 1
+                print(f"Telegram просит подождать {e.retry_after} сек. (чат {method.chat_id}), повтор {attempt}")
+                queue.bucket.pause(e.retry_after)
+                continue
+
+            self.sent += 1
+            return response
+
+    def stats(self) -> dict:
+        return {
+            "queued": sum(queue.waiting for queue in self.chats.values()),
+            "chats": len(self.chats),
+            "sent": self.sent,
+            "throttled": self.throttled,
+            "avg_throttle_delay": round(self.throttle_delay / self.throttled, 3) if self.throttled else 0.0,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+
+delivery = DeliveryMiddleware(
+    # В многопроцессном режиме общий лимит Telegram делится между процессами
+    settings.SEND_GLOBAL_RATE / max(settings.WORKERS, 1),
+    settings.SEND_CHAT_RATE,
+    settings.SEND_GROUP_RATE,
+    settings.SEND_CHAT_BURST,
+    settings.SEND_MAX_RETRIES
+)
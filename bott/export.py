@@ -0,0 +1,90 @@
+import html
+import json
+import shutil
+import tempfile
+import zipfile
+from aiogram.types.input_file import InputFile
+from sqlalchemy import select
+from config.settings import settings
+from database.db_session import create_async_session
+from database.models import Essay, Message
+
+BATCH_SIZE = 200
+# Больше Telegram не примет от бота
+MAX_ARCHIVE_SIZE = 50 * 1024 * 1024
+
+
+class SpooledInputFile(InputFile):
+    """Файл для отправки, который читается из временного файла кусками, а не целиком в память."""
+
+    def __init__(self, file, filename: str):
+        super().__init__(filename)
+        self.file = file
+
+    async def read(self, bot):
+        # При повторной отправке (например, после ответа 429) файл читается с начала
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+
+async def stream_rows(session, query):
+    # Строки читаются курсором пачками по BATCH_SIZE, а не загружаются все сразу
+    result = await session.stream(query.execution_options(yield_per=BATCH_SIZE))
+    async for rows in result.partitions(BATCH_SIZE):
+        for row in rows:
+            yield row
+
+
+def essay_markdown(topic: str, content: str, created_at) -> str:
+    return f"# {topic}\n\n_{created_at:%d.%m.%Y %H:%M}_\n\n{html.unescape(content or '')}\n"
+
+
+def check_markdown(text: str, answer: str, created_at) -> str:
+    return (
+        f"# Проверка сочинения\n\n_{created_at:%d.%m.%Y %H:%M}_\n\n"
+        f"## Текст\n\n{text or ''}\n\n## Результат проверки\n\n{html.unescape(answer or '')}\n"
+    )
+
+
+async def build_archive(user_id: int, file) -> dict:
+    """Пишет в file zip-архив с сочинениями и проверками пользователя.
+
+    Каждое сочинение и каждая проверка - отдельный Markdown-файл, общий список - index.jsonl.
+    Список тоже копится во временном файле, так что память не растет вместе с историей.
+    """
+    counts = {"essays": 0, "checks": 0}
+
+    def add_to_index(entry: dict):
+        index.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as archive, spooled_file() as index:
+        async with create_async_session() as session:
+            essays = select(Essay.id, Essay.topic, Essay.content, Essay.created_at).where(
+                Essay.user_id == user_id
+            ).order_by(Essay.id)
+            async for essay_id, topic, content, created_at in stream_rows(session, essays):
+                name = f"essays/{created_at:%Y-%m-%d}_{essay_id}.md"
+                archive.writestr(name, essay_markdown(topic, content, created_at))
+                add_to_index({"type": "essay", "file": name, "topic": topic, "created_at": created_at.isoformat()})
+                counts["essays"] += 1
+
+            checks = select(Message.id, Message.text, Message.answer, Message.created_at).where(
+                Message.user_id == user_id
+            ).order_by(Message.id)
+            async for message_id, text, answer, created_at in stream_rows(session, checks):
+                name = f"checks/{created_at:%Y-%m-%d}_{message_id}.md"
+                archive.writestr(name, check_markdown(text, answer, created_at))
+                add_to_index({"type": "check", "file": name, "created_at": created_at.isoformat()})
+                counts["checks"] += 1
+
+        index.seek(0)
+        with archive.open("index.jsonl", "w") as target:
+            shutil.copyfileobj(index, target)
+
+    return counts
+
+
+def spooled_file():
+    # Небольшой архив остается в памяти, большой уходит на диск
+    return tempfile.SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_SIZE)
@@ -1,23 +1,43 @@
 from aiogram import Router, types, F
-from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from config.answers import WELCOME_TEXT, HELP_TEXT, MENU_TEXT, COMMAND_REQUIREMENTS, DEFAULT_ESSAY_TEMPLATE
-from ai.agent import generate_text, check_essay, write_essay
-from database.db_session import create_session
-from database.models import User, Message, Essay, Template
+from config.settings import settings
+from config.answers import WELCOME_TEXT, HELP_TEXT, MENU_TEXT, COMMAND_REQUIREMENTS, DEFAULT_ESSAY_TEMPLATE, QUEUE_FULL_TEXT
+from ai.agent import cached_check, stream_fresh_check, stream_write_essay
+from ai.precheck import pre_checker, format_findings
+from ai.scheduler import scheduler, QueueFull, PRIORITY_CHECK, PRIORITY_WRITE
+from database.db_session import create_async_session
+from database.identity import user_ids
+from database.topic_index import topic_index
+from database.search_index import search, fetch_results, search_available
+from database.repository import get_templates, get_template, add_template, get_essay_page, get_essay
+from database.models import Message, Essay
+from database.writer import writer
 from bott.bot import main_board
+from bott.export import MAX_ARCHIVE_SIZE, SpooledInputFile, build_archive, spooled_file
+from bott.render import MAX_MESSAGE_LENGTH, clear_marks, split_message, highlight
+from bott.streaming import StreamingReply
+from bott.session_cache import SessionCache
+from metrics import metrics, MetricsMiddleware
 import html
-import math
+from datetime import datetime
 
 router = Router()
+router.message.middleware(MetricsMiddleware())
+router.callback_query.middleware(MetricsMiddleware())
 
 
 class HistoryStates(StatesGroup):
     browsing_history = State()
 
 
+class SearchStates(StatesGroup):
+    waiting_for_query = State()
+
+
 class TemplateStates(StatesGroup):
     waiting_for_template_name = State()
     waiting_for_template_content = State()
@@ -26,26 +46,40 @@ class TemplateStates(StatesGroup):
     selecting_template = State()
 
 
-def get_user(session, tg_id, name):
-    user = session.query(User).filter_by(tg_id=tg_id).first()
-    if not user:
-        user = User(tg_id=tg_id, name=name)
-        session.add(user)
-        session.commit()
-    return user
+async def show_queue_position(message: types.Message, text: str, job):
+    position = job.position()
+    if job.started or position <= scheduler.workers - scheduler.running:
+        return
+    await message.edit_text(f"{text}\n\nВаш запрос в очереди: {position}-й, ожидание около {job.eta()} сек.")
+
+
+def index_topic(essay: Essay):
+    topic_index.add(essay.id, essay.topic)
+
+
+async def stream_reply(reply: StreamingReply, chunks) -> str:
+    ai_answer = ""
+    async for ai_answer in chunks:
+        await reply.update(ai_answer)
+    return ai_answer
+
 
+history_cache = SessionCache(
+    settings.HISTORY_CACHE_SIZE,
+    settings.HISTORY_CACHE_TTL,
+    settings.HISTORY_CACHE_MAX_BYTES
+)
 
-def clear_marks(text: str) -> str:
-    text = html.escape(text)
-    text = text.replace("*", "")
-    text = text.replace("_", " ")
-    text = text.replace("`", "'")
-    text = text.replace("[", "(")
-    text = text.replace("]", ")")
-    return text
+HISTORY_PAGE_SIZE = 5
 
+search_cache = SessionCache(
+    settings.HISTORY_CACHE_SIZE,
+    settings.HISTORY_CACHE_TTL,
+    settings.HISTORY_CACHE_MAX_BYTES
+)
 
-history_cache = {}
+SEARCH_PAGE_SIZE = 5
+SEARCH_MAX_RESULTS = 100
 
 
 @router.message(Command("start"))
@@ -86,8 +120,11 @@ async def write_essay_command(msg: types.Message, state: FSMContext):
 @router.message(TemplateStates.waiting_for_essay_topic)
 async def process_essay(msg: types.Message, state: FSMContext):
     topic = msg.text
-    session = create_session()
-    user = get_user(session, msg.from_user.id, msg.from_user.full_name)
+    if not topic:
+        await msg.answer("Отправьте тему сочинения текстом.")
+        return
+
+    user_id = await user_ids.get(msg.from_user.id, msg.from_user.full_name)
 
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
@@ -97,14 +134,22 @@ async def process_essay(msg: types.Message, state: FSMContext):
             ]
         ]
     )
+    text = f"Тема сочинения: {topic}\n\n{DEFAULT_ESSAY_TEMPLATE}"
+
+    # Сочинение на почти такую же тему можно отдать сразу, без запроса к модели
+    match = topic_index.find(topic)
+    offered_essay_id = None
+    if match:
+        essay_id, similar_topic, score = match
+        offered_essay_id = essay_id
+        text += f"\n\nУже есть сочинение на похожую тему: «{similar_topic}» (сходство {score:.0%}). Его можно получить сразу."
+        keyboard.inline_keyboard.append([
+            InlineKeyboardButton(text="Взять готовое сочинение", callback_data=f"ready_essay_{essay_id}")
+        ])
 
-    await msg.answer(
-        f"Тема сочинения: {topic}\n\n{DEFAULT_ESSAY_TEMPLATE}",
-        reply_markup=keyboard
-    )
+    await msg.answer(text, reply_markup=keyboard)
 
-    await state.update_data(topic=topic, user_id=user.id)
-    session.close()
+    await state.update_data(topic=topic, user_id=user_id, offered_essay_id=offered_essay_id)
 
 
 @router.callback_query(F.data == "use_default_template")
@@ -114,38 +159,67 @@ async def use_default_template(callback: types.CallbackQuery, state: FSMContext)
 
     await callback.message.edit_text("Пишу сочинение...")
 
-    ai_answer = clear_marks(await write_essay(topic, DEFAULT_ESSAY_TEMPLATE))
+    reply = StreamingReply(callback.message, f"Сочинение на тему: {topic}\n\n")
+    try:
+        job = scheduler.submit(
+            callback.from_user.id,
+            PRIORITY_WRITE,
+            lambda: stream_reply(reply, stream_write_essay(topic, DEFAULT_ESSAY_TEMPLATE))
+        )
+    except QueueFull:
+        await callback.message.edit_text(QUEUE_FULL_TEXT)
+        return
 
-    session = create_session()
-    essay = Essay(
-        user_id=data.get("user_id"),
-        topic=topic,
-        content=ai_answer
-    )
-    session.add(essay)
-    session.commit()
+    await show_queue_position(callback.message, "Пишу сочинение...", job)
+    ai_answer = await job.result()
 
-    await callback.message.edit_text(
-        f"Сочинение на тему: {topic}\n\n{ai_answer}\n\nСочинение сохранено в историю!"
-    )
+    writer.add(Essay(user_id=data.get("user_id"), topic=topic, content=clear_marks(ai_answer)), on_saved=index_topic)
+
+    await reply.finish(f"{ai_answer}\n\nСочинение сохранено в историю!")
 
-    session.close()
     await state.clear()
 
 
+@router.callback_query(F.data.startswith("ready_essay_"))
+async def use_ready_essay(callback: types.CallbackQuery, state: FSMContext):
+    essay_id = int(callback.data.split("_")[2])
+    data = await state.get_data()
+    topic = data.get("topic")
+
+    # Отдаем только то сочинение, которое бот сам предложил этому пользователю
+    if essay_id != data.get("offered_essay_id"):
+        await callback.answer("Сочинение не найдено")
+        return
+
+    async with create_async_session() as session:
+        essay = await get_essay(session, essay_id)
+
+    if not essay or not topic:
+        await callback.answer("Сочинение не найдено")
+        return
+
+    parts = split_message(f"Сочинение на тему: {essay.topic}\n\n{essay.content}\n\nСочинение сохранено в историю!")
+    await callback.message.edit_text(next(parts))
+    for part in parts:
+        await callback.message.answer(part)
+
+    writer.add(Essay(user_id=data.get("user_id"), topic=topic, content=essay.content))
+
+    await state.clear()
+    await callback.answer()
+
+
 @router.callback_query(F.data == "select_my_template")
 async def select_my_template(callback: types.CallbackQuery, state: FSMContext):
-    session = create_session()
-    user = get_user(session, callback.from_user.id, callback.from_user.full_name)
-
-    templates = session.query(Template).filter_by(user_id=user.id).all()
+    user_id = await user_ids.get(callback.from_user.id, callback.from_user.full_name)
+    async with create_async_session() as session:
+        templates = await get_templates(session, user_id)
 
     if not templates:
         await callback.message.answer(
             "У вас пока нет своих шаблонов. Создайте новый через /templates",
             reply_markup=main_board()
         )
-        session.close()
         return
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[])
@@ -159,7 +233,6 @@ async def select_my_template(callback: types.CallbackQuery, state: FSMContext):
         reply_markup=keyboard
     )
 
-    session.close()
     await state.set_state(TemplateStates.selecting_template)
 
 
@@ -169,27 +242,30 @@ async def use_selected_template(callback: types.CallbackQuery, state: FSMContext
     data = await state.get_data()
     topic = data.get("topic")
 
-    session = create_session()
-    template = session.query(Template).filter_by(id=template_id).first()
+    async with create_async_session() as session:
+        template = await get_template(session, template_id)
 
     if template:
         await callback.message.edit_text("Пишу сочинение по вашему шаблону...")
 
-        ai_answer = clear_marks(await write_essay(topic, template.content))
+        reply = StreamingReply(callback.message, f"Сочинение на тему: {topic}\n\n")
+        try:
+            job = scheduler.submit(
+                callback.from_user.id,
+                PRIORITY_WRITE,
+                lambda: stream_reply(reply, stream_write_essay(topic, template.content))
+            )
+        except QueueFull:
+            await callback.message.edit_text(QUEUE_FULL_TEXT)
+            return
 
-        essay = Essay(
-            user_id=data.get("user_id"),
-            topic=topic,
-            content=ai_answer
-        )
-        session.add(essay)
-        session.commit()
+        await show_queue_position(callback.message, "Пишу сочинение по вашему шаблону...", job)
+        ai_answer = await job.result()
 
-        await callback.message.edit_text(
-            f"Сочинение на тему: {topic}\n\n{ai_answer}\n\nСочинение сохранено в историю!"
-        )
+        writer.add(Essay(user_id=data.get("user_id"), topic=topic, content=clear_marks(ai_answer)), on_saved=index_topic)
+
+        await reply.finish(f"{ai_answer}\n\nСочинение сохранено в историю!")
 
-    session.close()
     await state.clear()
 
 
@@ -205,29 +281,52 @@ async def check_essay_command(msg: types.Message, state: FSMContext):
 @router.message(TemplateStates.waiting_for_essay_check)
 async def process_essay_check(msg: types.Message, state: FSMContext):
     essay_text = msg.text
-    session = create_session()
-    user = get_user(session, msg.from_user.id, msg.from_user.full_name)
+    if not essay_text:
+        await msg.answer("Отправьте текст сочинения сообщением.")
+        return
 
-    await msg.answer("Проверяю сочинение на ошибки...")
+    user_id = await user_ids.get(msg.from_user.id, msg.from_user.full_name)
 
-    ai_answer = clear_marks(await check_essay(essay_text))
+    # Локальная проверка занимает миллисекунды, ее результат показываем сразу
+    findings = pre_checker.check(essay_text)
+    if findings:
+        await msg.answer(clear_marks(format_findings(findings)))
 
-    db_msg = Message(user_id=user.id, text=essay_text, answer=ai_answer)
-    session.add(db_msg)
-    session.commit()
+    status = await msg.answer("Проверяю сочинение на ошибки...")
 
-    max_length = 4000
-    if len(ai_answer) > max_length:
-        parts = [ai_answer[i:i + max_length] for i in range(0, len(ai_answer), max_length)]
-        for i, part in enumerate(parts, 1):
-            await msg.answer(f"Часть {i}:\n\n{part}")
-    else:
-        await msg.answer(f"Результат проверки:\n\n{ai_answer}")
+    reply = StreamingReply(status, "Результат проверки:\n\n")
+
+    # Готовый ответ из кэша отдаем сразу, мимо очереди к модели
+    ai_answer = await cached_check(essay_text)
+    if ai_answer is None:
+        try:
+            job = scheduler.submit(
+                msg.from_user.id,
+                PRIORITY_CHECK,
+                lambda: stream_reply(reply, stream_fresh_check(essay_text, findings))
+            )
+        except QueueFull:
+            await status.edit_text(QUEUE_FULL_TEXT)
+            return
+
+        await show_queue_position(status, "Проверяю сочинение на ошибки...", job)
+        ai_answer = await job.result()
+    await reply.finish(ai_answer)
+
+    writer.add(Message(user_id=user_id, text=essay_text, answer=clear_marks(ai_answer)))
 
-    session.close()
     await state.clear()
 
 
+@router.message(Command("stats"))
+async def stats_command(msg: types.Message):
+    if msg.from_user.id not in settings.ADMIN_IDS:
+        return
+
+    for part in split_message(metrics.summary() or "Метрик пока нет"):
+        await msg.answer(part)
+
+
 @router.message(Command("templates"))
 async def templates_command(msg: types.Message):
     await msg.answer(
@@ -252,10 +351,9 @@ async def templates_command(msg: types.Message):
 
 @router.callback_query(F.data == "show_templates")
 async def show_templates(callback: types.CallbackQuery):
-    session = create_session()
-    user = get_user(session, callback.from_user.id, callback.from_user.full_name)
-
-    templates = session.query(Template).filter_by(user_id=user.id).all()
+    user_id = await user_ids.get(callback.from_user.id, callback.from_user.full_name)
+    async with create_async_session() as session:
+        templates = await get_templates(session, user_id)
 
     if not templates:
         await callback.message.answer("У вас пока нет своих шаблонов. Создайте новый!")
@@ -266,8 +364,6 @@ async def show_templates(callback: types.CallbackQuery):
 
         await callback.message.answer(response)
 
-    session.close()
-
 
 @router.callback_query(F.data == "create_template")
 async def create_template_start(callback: types.CallbackQuery, state: FSMContext):
@@ -289,21 +385,12 @@ async def process_template_content(msg: types.Message, state: FSMContext):
     template_name = data.get("template_name")
     template_content = msg.text
 
-    session = create_session()
-    user = get_user(session, msg.from_user.id, msg.from_user.full_name)
-
-    template = Template(
-        user_id=user.id,
-        name=template_name,
-        content=template_content
-    )
-
-    session.add(template)
-    session.commit()
+    user_id = await user_ids.get(msg.from_user.id, msg.from_user.full_name)
+    async with create_async_session() as session:
+        await add_template(session, user_id, template_name, template_content)
 
     await msg.answer(f"Шаблон '{template_name}' успешно сохранен!")
 
-    session.close()
     await state.clear()
 
 
@@ -314,66 +401,73 @@ async def use_template_command(callback: types.CallbackQuery):
 
 @router.message(Command("history"))
 async def history_command(msg: types.Message, state: FSMContext):
-    session = create_session()
-    user = get_user(session, msg.from_user.id, msg.from_user.full_name)
-
-    essays = session.query(Essay).filter_by(user_id=user.id).order_by(Essay.created_at.desc()).all()
-
-    if not essays:
-        await msg.answer("У вас пока нет сохраненных сочинений.")
-        session.close()
-        return
+    user_id = await user_ids.get(msg.from_user.id, msg.from_user.full_name)
+    if writer.has_pending(user_id):
+        await writer.flush()
 
     history_cache[msg.from_user.id] = {
-        'essays': essays,
+        'user_id': user_id,
+        'cursors': [None],
         'current_page': 0,
-        'total_pages': math.ceil(len(essays) / 5)
+        'essays': None,
+        'has_next': False
     }
 
-    await show_history_page(msg, msg.from_user.id)
+    if not await show_history_page(msg, msg.from_user.id):
+        history_cache.pop(msg.from_user.id)
+        await msg.answer("У вас пока нет сохраненных сочинений.")
+        return
 
-    session.close()
     await state.set_state(HistoryStates.browsing_history)
 
 
-async def show_history_page(msg: types.Message, user_id: int, page: int = 0):
+async def show_history_page(msg: types.Message, user_id: int, page: int = 0) -> bool:
     if user_id not in history_cache:
-        return
+        return False
 
     data = history_cache[user_id]
-    essays = data['essays']
-    total_pages = data['total_pages']
+    cursors = data['cursors']
 
-    if page >= total_pages:
+    if page < 0 or page >= len(cursors):
         page = 0
-    if page < 0:
-        page = total_pages - 1
 
-    start_idx = page * 5
-    end_idx = start_idx + 5
-    page_essays = essays[start_idx:end_idx]
+    if page == data['current_page'] and data['essays'] is not None:
+        page_essays, has_next = data['essays'], data['has_next']
+    else:
+        async with create_async_session() as session:
+            rows = await get_essay_page(session, data['user_id'], cursors[page], HISTORY_PAGE_SIZE + 1)
+
+        if not rows:
+            return False
 
-    response = f"История сочинений (стр. {page + 1}/{total_pages}):\n\n"
+        has_next = len(rows) > HISTORY_PAGE_SIZE
+        page_essays = [(row.id, row.topic, row.created_at) for row in rows[:HISTORY_PAGE_SIZE]]
+        if has_next and len(cursors) == page + 1:
+            essay_id, _, created_at = page_essays[-1]
+            cursors.append((created_at, essay_id))
+
+    start_idx = page * HISTORY_PAGE_SIZE
+
+    response = f"История сочинений (стр. {page + 1}):\n\n"
 
     keyboard_buttons = []
 
-    for i, essay in enumerate(page_essays, start=1):
+    for i, (essay_id, topic, created_at) in enumerate(page_essays, start=1):
         essay_num = start_idx + i
-        response += f"{essay_num}. {essay.topic} ({essay.created_at.strftime('%d.%m.%Y %H:%M')})\n"
+        response += f"{essay_num}. {topic} ({created_at.strftime('%d.%m.%Y %H:%M')})\n"
 
         keyboard_buttons.append([
             InlineKeyboardButton(
-                text=f"{essay_num}. {essay.topic[:30]}...",
-                callback_data=f"view_essay_{essay.id}"
+                text=f"{essay_num}. {topic[:30]}...",
+                callback_data=f"view_essay_{essay_id}"
             )
         ])
 
     nav_buttons = []
-    if total_pages > 1:
-        if page > 0:
-            nav_buttons.append(InlineKeyboardButton(text="Назад", callback_data=f"history_prev_{page}"))
-        if page < total_pages - 1:
-            nav_buttons.append(InlineKeyboardButton(text="Вперед", callback_data=f"history_next_{page}"))
+    if page > 0:
+        nav_buttons.append(InlineKeyboardButton(text="Назад", callback_data=f"history_prev_{page}"))
+    if has_next:
+        nav_buttons.append(InlineKeyboardButton(text="Вперед", callback_data=f"history_next_{page}"))
 
     if nav_buttons:
         keyboard_buttons.append(nav_buttons)
@@ -384,10 +478,13 @@ async def show_history_page(msg: types.Message, user_id: int, page: int = 0):
 
     try:
         await msg.edit_text(response, reply_markup=keyboard)
-    except:
+    except TelegramBadRequest:
+        # Сообщение нельзя отредактировать (например, это команда пользователя) - отправляем новое
         await msg.answer(response, reply_markup=keyboard)
 
-    history_cache[user_id]['current_page'] = page
+    data.update(current_page=page, essays=page_essays, has_next=has_next)
+    history_cache[user_id] = data
+    return True
 
 
 @router.callback_query(F.data.startswith("history_"))
@@ -405,8 +502,8 @@ async def history_navigation(callback: types.CallbackQuery, state: FSMContext):
 async def view_essay(callback: types.CallbackQuery):
     essay_id = int(callback.data.split("_")[2])
 
-    session = create_session()
-    essay = session.query(Essay).filter_by(id=essay_id).first()
+    async with create_async_session() as session:
+        essay = await get_essay(session, essay_id)
 
     if essay:
         keyboard = InlineKeyboardMarkup(
@@ -415,30 +512,22 @@ async def view_essay(callback: types.CallbackQuery):
             ]
         )
 
-        max_length = 4000
-        essay_text = essay.content
-
-        if len(essay_text) > max_length:
-            parts = [essay_text[i:i + max_length] for i in range(0, len(essay_text), max_length)]
-            for i, part in enumerate(parts, 1):
-                if i == 1:
-                    await callback.message.edit_text(
-                        f"Сочинение: {essay.topic}\n"
-                        f"Дата: {essay.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
-                        f"Часть {i}:\n{part}",
-                        reply_markup=keyboard
-                    )
-                else:
-                    await callback.message.answer(f"Часть {i}:\n{part}")
+        header = (
+            f"Сочинение: {essay.topic}\n"
+            f"Дата: {essay.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
+        )
+        parts = split_message(essay.content, max(MAX_MESSAGE_LENGTH - len(header), MAX_MESSAGE_LENGTH // 2) - 20)
+        first = next(parts, "")
+        second = next(parts, None)
+
+        if second is None:
+            await callback.message.edit_text(header + first, reply_markup=keyboard)
         else:
-            await callback.message.edit_text(
-                f"Сочинение: {essay.topic}\n"
-                f"Дата: {essay.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
-                f"{essay_text}",
-                reply_markup=keyboard
-            )
+            await callback.message.edit_text(header + f"Часть 1:\n{first}", reply_markup=keyboard)
+            await callback.message.answer(f"Часть 2:\n{second}")
+            for i, part in enumerate(parts, 3):
+                await callback.message.answer(f"Часть {i}:\n{part}")
 
-    session.close()
     await callback.answer()
 
 
@@ -454,14 +543,159 @@ async def back_to_history(callback: types.CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "close_history")
 async def close_history(callback: types.CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
-    if user_id in history_cache:
-        del history_cache[user_id]
+    history_cache.pop(user_id)
 
     await callback.message.delete()
     await callback.answer("История закрыта")
     await state.clear()
 
 
+@router.message(Command("search"))
+async def search_command(msg: types.Message, state: FSMContext, command: CommandObject):
+    if command.args:
+        await start_search(msg, command.args)
+        return
+
+    await msg.answer(COMMAND_REQUIREMENTS["search"], reply_markup=main_board())
+    await state.set_state(SearchStates.waiting_for_query)
+
+
+@router.message(SearchStates.waiting_for_query)
+async def process_search_query(msg: types.Message, state: FSMContext):
+    if not msg.text:
+        await msg.answer("Отправьте слова для поиска текстом.")
+        return
+
+    await state.clear()
+    await start_search(msg, msg.text)
+
+
+async def start_search(msg: types.Message, query: str):
+    if not search_available():
+        await msg.answer("Поиск доступен только при работе с базой SQLite.")
+        return
+
+    user_id = await user_ids.get(msg.from_user.id, msg.from_user.full_name)
+    if writer.has_pending(user_id):
+        await writer.flush()
+
+    # Порядок результатов запоминается сразу: ранги меняются, когда кто-то сохраняет новые тексты
+    async with create_async_session() as session:
+        rowids = await search(session, user_id, query, SEARCH_MAX_RESULTS)
+
+    search_cache[msg.from_user.id] = {
+        'user_id': user_id,
+        'query': query,
+        'rowids': rowids,
+    }
+
+    if not await show_search_page(msg, msg.from_user.id):
+        search_cache.pop(msg.from_user.id)
+        await msg.answer("Ничего не найдено. Попробуйте другие слова.")
+
+
+async def show_search_page(msg: types.Message, user_id: int, page: int = 0) -> bool:
+    data = search_cache.get(user_id)
+    if data is None:
+        return False
+
+    rowids = data['rowids']
+    if page < 0 or page * SEARCH_PAGE_SIZE >= len(rowids):
+        page = 0
+
+    page_rowids = rowids[page * SEARCH_PAGE_SIZE:(page + 1) * SEARCH_PAGE_SIZE]
+    async with create_async_session() as session:
+        rows = await fetch_results(session, data['user_id'], data['query'], page_rowids)
+
+    if not rows:
+        return False
+
+    has_next = (page + 1) * SEARCH_PAGE_SIZE < len(rowids)
+
+    response = f"Поиск «{html.escape(data['query'])}» (стр. {page + 1}):\n\n"
+    keyboard_buttons = []
+
+    for i, row in enumerate(rows, start=page * SEARCH_PAGE_SIZE + 1):
+        created_at = datetime.fromisoformat(row.created_at).strftime('%d.%m.%Y %H:%M')
+        if row.kind == "essay":
+            response += f"{i}. Сочинение: {html.escape(row.title)} ({created_at})\n"
+            keyboard_buttons.append([
+                InlineKeyboardButton(text=f"{i}. {row.title[:30]}...", callback_data=f"view_essay_{row.ref_id}")
+            ])
+        else:
+            response += f"{i}. Проверка ({created_at})\n"
+        response += f"{highlight(row.snippet)}\n\n"
+
+    nav_buttons = []
+    if page > 0:
+        nav_buttons.append(InlineKeyboardButton(text="Назад", callback_data=f"search_prev_{page}"))
+    if has_next:
+        nav_buttons.append(InlineKeyboardButton(text="Вперед", callback_data=f"search_next_{page}"))
+    if nav_buttons:
+        keyboard_buttons.append(nav_buttons)
+
+    keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+    try:
+        await msg.edit_text(response, reply_markup=keyboard, parse_mode="HTML")
+    except TelegramBadRequest:
+        await msg.answer(response, reply_markup=keyboard, parse_mode="HTML")
+
+    search_cache[user_id] = data
+    return True
+
+
+@router.callback_query(F.data.startswith("search_"))
+async def search_navigation(callback: types.CallbackQuery):
+    page = int(callback.data.split("_")[2])
+    if callback.data.startswith("search_prev_"):
+        page -= 1
+    else:
+        page += 1
+
+    if not await show_search_page(callback.message, callback.from_user.id, page):
+        await callback.answer("Результаты поиска устарели, повторите /search")
+        return
+    await callback.answer()
+
+
+exporting = set()
+
+
+@router.message(Command("export"))
+async def export_command(msg: types.Message):
+    # Одновременно у пользователя собирается только один архив
+    if msg.from_user.id in exporting:
+        await msg.answer("Архив уже собирается, подождите немного.")
+        return
+
+    exporting.add(msg.from_user.id)
+    try:
+        user_id = await user_ids.get(msg.from_user.id, msg.from_user.full_name)
+        if writer.has_pending(user_id):
+            await writer.flush()
+
+        status = await msg.answer("Собираю архив с вашими сочинениями...")
+        with spooled_file() as file:
+            counts = await build_archive(user_id, file)
+            if not counts["essays"] and not counts["checks"]:
+                await status.edit_text("У вас пока нет сохраненных сочинений и проверок.")
+                return
+
+            size = file.tell()
+            if size > MAX_ARCHIVE_SIZE:
+                await status.edit_text("Архив получился слишком большим для отправки в Telegram.")
+                return
+
+            await msg.answer_document(
+                SpooledInputFile(file, "essays.zip"),
+                caption=f"Сочинений: {counts['essays']}, проверок: {counts['checks']}"
+            )
+        await status.delete()
+    finally:
+        exporting.discard(msg.from_user.id)
+
+
 @router.message(HistoryStates.browsing_history)
 async def history_state(msg: types.Message):
     await msg.answer("Для выхода из режима истории нажмите 'Закрыть историю' или используйте команды бота")
@@ -0,0 +1,60 @@
+import html
+
+MAX_MESSAGE_LENGTH = 4000
+
+# Замены после html.escape. Цепочка str.replace на русском тексте быстрее, чем один проход
+# str.translate или re.sub: см. python -m benchmarks.render
+MARKS = (("*", ""), ("_", " "), ("`", "'"), ("[", "("), ("]", ")"))
+
+SENTENCE_ENDS = (". ", "! ", "? ", "… ", ".\n", "!\n", "?\n")
+
+
+def clear_marks(text: str) -> str:
+    text = html.escape(text)
+    for mark, replacement in MARKS:
+        text = text.replace(mark, replacement)
+    return text
+
+
+def highlight(snippet: str) -> str:
+    """Фрагмент из поиска в HTML: совпадения, отмеченные маркерами FTS5, выделяются жирным."""
+    text = html.escape(html.unescape(snippet))
+    return text.replace("\x02", "<b>").replace("\x03", "</b>")
+
+
+def find_cut(window: str) -> int:
+    """Место разреза окна: конец абзаца, строки, предложения или слова - что найдется во второй половине."""
+    half = len(window) // 2
+
+    cut = window.rfind("\n\n")
+    if cut <= half:
+        cut = window.rfind("\n")
+    if cut <= half:
+        cut = max(window.rfind(end) for end in SENTENCE_ENDS) + 1
+    if cut <= half:
+        cut = window.rfind(" ")
+    if cut <= half:
+        cut = len(window)
+
+    # Не разрываем HTML-сущность вроде &quot;
+    amp = window.rfind("&", 0, cut)
+    if amp != -1 and window.find(";", amp, cut) == -1 and cut - amp <= 8:
+        cut = amp
+    return cut
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH):
+    """Лениво делит текст на части не длиннее limit по границам абзацев и предложений."""
+    pos = 0
+    while len(text) - pos > limit:
+        cut = find_cut(text[pos:pos + limit])
+        part = text[pos:pos + cut].strip()
+        if part:
+            yield part
+        pos += cut
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+
+    part = text[pos:].strip()
+    if part:
+        yield part
@@ -0,0 +1,96 @@
+import sys
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class SessionCache:
+    """Состояние пользовательских сессий с вытеснением по LRU, времени простоя и общему объему."""
+
+    def __init__(self, max_items: int, ttl: int, max_bytes: int):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._discard(key)
+        size = estimate_size(value)
+        self.items[key] = (value, size, time.monotonic())
+        self.bytes += size
+        self._evict()
+
+    def __delitem__(self, key):
+        if not self._discard(key):
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, key, default=None):
+        item = self.items.get(key)
+        if item is None:
+            return default
+
+        value, size, touched_at = item
+        if time.monotonic() - touched_at > self.ttl:
+            self._discard(key)
+            self.expirations += 1
+            return default
+
+        self.items[key] = (value, size, time.monotonic())
+        self.items.move_to_end(key)
+        return value
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        self._discard(key)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.items),
+            "bytes": self.bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _discard(self, key) -> bool:
+        item = self.items.pop(key, None)
+        if item is None:
+            return False
+        self.bytes -= item[1]
+        return True
+
+    def _evict(self):
+        now = time.monotonic()
+        while self.items:
+            key, (_, _, touched_at) = next(iter(self.items.items()))
+            if now - touched_at > self.ttl:
+                self._discard(key)
+                self.expirations += 1
+            elif len(self.items) > self.max_items or self.bytes > self.max_bytes:
+                self._discard(key)
+                self.evictions += 1
+            else:
+                break
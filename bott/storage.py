@@ -0,0 +1,92 @@
+import json
+from datetime import datetime
+from typing import Any, Mapping
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from bott.session_cache import SessionCache
+from config.settings import settings
+from database.db_session import create_async_session
+from database.models import FsmRecord
+from database.writer import writer
+
+
+def make_key(key: StorageKey) -> str:
+    return ":".join(str(part) if part is not None else "" for part in (
+        key.bot_id,
+        key.chat_id,
+        key.user_id,
+        key.thread_id,
+        key.business_connection_id,
+        key.destiny,
+    ))
+
+
+class DatabaseStorage(BaseStorage):
+    """Хранилище FSM в таблице fsm_records.
+
+    По умолчанию каждое изменение сразу коммитится, а чтение идет в базу,
+    поэтому одно хранилище могут делить несколько процессов или реплик.
+    С cached=True чтения обслуживаются из кэша в памяти процесса, а записи уходят
+    в базу пачками через writer. Это допустимо, только когда все обновления
+    пользователя обрабатывает один процесс, например при WORKERS > 1 на одной машине.
+    """
+
+    def __init__(self, cached: bool = settings.FSM_CACHE):
+        self.cache = None
+        if cached:
+            self.cache = SessionCache(settings.FSM_CACHE_SIZE, settings.FSM_CACHE_TTL, settings.FSM_CACHE_MAX_BYTES)
+
+    async def close(self) -> None:
+        await writer.flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        _, data = await self._load(make_key(key))
+        await self._store(make_key(key), state, data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._load(make_key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        state, _ = await self._load(make_key(key))
+        await self._store(make_key(key), state, dict(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._load(make_key(key))
+        return dict(data)
+
+    async def _store(self, key: str, state: str | None, data: dict):
+        record = FsmRecord(
+            key=key,
+            state=state,
+            data=json.dumps(data, ensure_ascii=False),
+            updated_at=datetime.utcnow()
+        )
+        if self.cache is None:
+            async with create_async_session() as session:
+                await session.merge(record)
+                await session.commit()
+            return
+
+        self.cache[key] = (state, data)
+        writer.add(record)
+
+    async def _load(self, key: str) -> tuple:
+        if self.cache is None:
+            async with create_async_session() as session:
+                row = await session.get(FsmRecord, key)
+            return (row.state, json.loads(row.data or "{}")) if row else (None, {})
+
+        record = self.cache.get(key)
+        if record is not None:
+            return record
+
+        row = writer.find(lambda pending: isinstance(pending, FsmRecord) and pending.key == key)
+        if row is None:
+            async with create_async_session() as session:
+                row = await session.get(FsmRecord, key)
+
+        record = (row.state, json.loads(row.data or "{}")) if row else (None, {})
+        self.cache[key] = record
+        return record
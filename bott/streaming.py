@@ -0,0 +1,45 @@
+import time
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from bott.render import MAX_MESSAGE_LENGTH, clear_marks, split_message
+
+EDIT_INTERVAL = 1.5
+
+
+class StreamingReply:
+    """Постепенно выводит растущий текст, редактируя сообщения не чаще EDIT_INTERVAL секунд.
+
+    Промежуточные версии текста, пришедшие между правками, схлопываются в одну
+    и даже не очищаются от разметки.
+    Когда текст выходит за MAX_MESSAGE_LENGTH, продолжение уходит в новое сообщение.
+    """
+
+    def __init__(self, message: types.Message, header: str = ""):
+        self.header = header
+        self.messages = [message]
+        self.shown = [None]
+        self.last_edit = 0.0
+
+    async def update(self, text: str, force: bool = False):
+        if not force and time.monotonic() - self.last_edit < EDIT_INTERVAL:
+            return
+
+        full = self.header + clear_marks(text)
+        if not full.strip():
+            return
+
+        for i, part in enumerate(split_message(full, MAX_MESSAGE_LENGTH)):
+            if i >= len(self.messages):
+                self.messages.append(await self.messages[-1].answer(part))
+                self.shown.append(part)
+            elif self.shown[i] != part:
+                try:
+                    await self.messages[i].edit_text(part)
+                except TelegramBadRequest:
+                    pass
+                self.shown[i] = part
+
+        self.last_edit = time.monotonic()
+
+    async def finish(self, text: str):
+        await self.update(text, force=True)
@@ -22,6 +22,8 @@ MENU_TEXT = (
     "/check - Проверить сочинение на ошибки\n"
     "/templates - Управление шаблонами сочинений\n"
     "/history - Посмотреть историю сочинений\n"
+    "/search - Найти сочинение или проверку по словам\n"
+    "/export - Скачать все сочинения и проверки одним архивом\n"
     "/menu - Показать это меню"
 )
 
@@ -29,7 +31,8 @@ COMMAND_REQUIREMENTS = {
     "write": "Написать сочинение\n\nОтправьте тему сочинения или текст, который нужно развить.",
     "check": "Проверить сочинение\n\nОтправьте текст сочинения для проверки на ошибки.",
     "templates": "Шаблоны сочинений\n\nВыберите действие:\n1. Показать мои шаблоны\n2. Создать новый шаблон\n3. Использовать шаблон",
-    "history": "История сочинений\n\nПоказываю ваши последние сочинения:"
+    "history": "История сочинений\n\nПоказываю ваши последние сочинения:",
+    "search": "Поиск\n\nОтправьте слова, которые нужно найти в ваших сочинениях и проверках.\nМожно сразу: /search Онегин Татьяна"
 }
 
 DEFAULT_ESSAY_TEMPLATE = """*Структура сочинения:*
@@ -51,4 +54,5 @@ DEFAULT_ESSAY_TEMPLATE = """*Структура сочинения:*
 • Аргументы: логичные и подкрепленные примерами
 • Стиль: единый на протяжении всего текста"""
 
-REPLY_BUTTONS = ["Меню", "Помощь"]
\ No newline at end of file
+REPLY_BUTTONS = ["Меню", "Помощь"]
+QUEUE_FULL_TEXT = "Сейчас слишком много запросов. Пожалуйста, попробуйте ещё раз через минуту."
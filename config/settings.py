@@ -5,7 +5,65 @@ load_dotenv()
 
 class Settings:
     BOT_TOKEN: str = os.getenv("BOT_TOKEN")
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///esse.db")
+    BOT_MODE: str = os.getenv("BOT_MODE", "polling")
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    WEBHOOK_URL: str = os.getenv("WEBHOOK_URL")
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET")
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8080"))
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9100"))
+    ADMIN_IDS: set = {int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()}
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///db/esse.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    SQLITE_POOL_SIZE: int = int(os.getenv("SQLITE_POOL_SIZE", "5"))
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
     GIGACHAT_KEY: str = os.getenv("GIGACHAT_KEY")
+    GIGACHAT_MAX_CONNECTIONS: int = int(os.getenv("GIGACHAT_MAX_CONNECTIONS", "10"))
+    GIGACHAT_CONCURRENCY: int = int(os.getenv("GIGACHAT_CONCURRENCY", "5"))
+    GIGACHAT_TIMEOUT: float = float(os.getenv("GIGACHAT_TIMEOUT", "60"))
+    GIGACHAT_CONTEXT_TOKENS: int = int(os.getenv("GIGACHAT_CONTEXT_TOKENS", "8192"))
+    PROMPT_TEMPLATE_TOKENS: int = int(os.getenv("PROMPT_TEMPLATE_TOKENS", "600"))
+    PROMPT_TOPIC_TOKENS: int = int(os.getenv("PROMPT_TOPIC_TOKENS", "100"))
+    PROMPT_KNOWN_TOKENS: int = int(os.getenv("PROMPT_KNOWN_TOKENS", "400"))
+    PRECHECK_DICTIONARY: str = os.getenv("PRECHECK_DICTIONARY")
+    CHECK_CHUNK_THRESHOLD: int = int(os.getenv("CHECK_CHUNK_THRESHOLD", "2500"))
+    CHECK_CHUNK_SIZE: int = int(os.getenv("CHECK_CHUNK_SIZE", "1500"))
+    CHECK_CHUNK_OVERLAP: int = int(os.getenv("CHECK_CHUNK_OVERLAP", "1"))
+    CHECK_CACHE_SIZE: int = int(os.getenv("CHECK_CACHE_SIZE", "512"))
+    CHECK_CACHE_TTL: int = int(os.getenv("CHECK_CACHE_TTL", "3600"))
+    CHECK_CACHE_DB_TTL: int = int(os.getenv("CHECK_CACHE_DB_TTL", str(30 * 24 * 3600)))
+    SCHEDULER_WORKERS: int = int(os.getenv("SCHEDULER_WORKERS", "5"))
+    SCHEDULER_QUEUE_SIZE: int = int(os.getenv("SCHEDULER_QUEUE_SIZE", "100"))
+    SCHEDULER_USER_QUEUE_SIZE: int = int(os.getenv("SCHEDULER_USER_QUEUE_SIZE", "3"))
+    SEND_GLOBAL_RATE: float = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+    SEND_CHAT_RATE: float = float(os.getenv("SEND_CHAT_RATE", "1"))
+    SEND_GROUP_RATE: float = float(os.getenv("SEND_GROUP_RATE", str(20 / 60)))
+    SEND_CHAT_BURST: int = int(os.getenv("SEND_CHAT_BURST", "3"))
+    SEND_MAX_RETRIES: int = int(os.getenv("SEND_MAX_RETRIES", "3"))
+    WRITE_BATCH_SIZE: int = int(os.getenv("WRITE_BATCH_SIZE", "50"))
+    WRITE_FLUSH_INTERVAL: float = float(os.getenv("WRITE_FLUSH_INTERVAL", "1"))
+    WRITE_MAX_BACKOFF: float = float(os.getenv("WRITE_MAX_BACKOFF", "60"))
+    TOPIC_MATCH_THRESHOLD: float = float(os.getenv("TOPIC_MATCH_THRESHOLD", "0.6"))
+    EXPORT_SPOOL_SIZE: int = int(os.getenv("EXPORT_SPOOL_SIZE", str(4 * 1024 * 1024)))
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    FSM_CACHE: bool = os.getenv("FSM_CACHE", "false").lower() == "true"
+    FSM_CACHE_SIZE: int = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+    FSM_CACHE_TTL: int = int(os.getenv("FSM_CACHE_TTL", "3600"))
+    FSM_CACHE_MAX_BYTES: int = int(os.getenv("FSM_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    HISTORY_CACHE_SIZE: int = int(os.getenv("HISTORY_CACHE_SIZE", "1000"))
+    HISTORY_CACHE_TTL: int = int(os.getenv("HISTORY_CACHE_TTL", "1800"))
+    HISTORY_CACHE_MAX_BYTES: int = int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+
+def per_process(limit: int) -> int:
+    # В многопроцессном режиме лимиты общие на все процессы, поэтому делятся между ними
+    return max(limit // max(settings.WORKERS, 1), 1)
@@ -0,0 +1,39 @@
+import base64
+import zlib
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+
+MARKER = "zlib1:"
+MIN_LENGTH = 256
+
+
+def compress(value: str) -> str:
+    if value is None:
+        return None
+    # Строку, похожую на сжатую, сжимаем всегда, чтобы при чтении ее не перепутать
+    if len(value) < MIN_LENGTH and not value.startswith(MARKER):
+        return value
+
+    packed = MARKER + base64.b85encode(zlib.compress(value.encode("utf-8"), 6)).decode("ascii")
+    if len(packed) >= len(value.encode("utf-8")) and not value.startswith(MARKER):
+        return value
+    return packed
+
+
+def decompress(value: str) -> str:
+    if value is None or not value.startswith(MARKER):
+        return value
+    return zlib.decompress(base64.b85decode(value[len(MARKER):])).decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """Text, который хранится сжатым; старые несжатые строки читаются как есть."""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress(value)
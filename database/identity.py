@@ -0,0 +1,68 @@
+import asyncio
+from collections import OrderedDict
+from sqlalchemy import select
+from config.settings import settings
+from database.db_session import create_async_session
+from database.models import User
+from database.repository import get_user
+
+
+class UserIdentityCache:
+    """Соответствие tg_id -> users.id, чтобы не ходить в базу на каждое сообщение."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def warm_up(self):
+        async with create_async_session() as session:
+            result = await session.execute(
+                select(User.tg_id, User.id).order_by(User.id.desc()).limit(self.max_size)
+            )
+            for tg_id, user_id in reversed(list(result)):
+                self._remember(tg_id, user_id)
+
+    async def get(self, tg_id: int, name: str) -> int:
+        user_id = self.items.get(tg_id)
+        if user_id is not None:
+            self.items.move_to_end(tg_id)
+            self.hits += 1
+            return user_id
+
+        self.misses += 1
+
+        # Одновременные первые сообщения одного пользователя ждут один и тот же запрос к базе
+        task = self.pending.get(tg_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(tg_id, name))
+            self.pending[tg_id] = task
+            task.add_done_callback(lambda _: self.pending.pop(tg_id, None))
+
+        return await asyncio.shield(task)
+
+    async def _load(self, tg_id: int, name: str) -> int:
+        async with create_async_session() as session:
+            user = await get_user(session, tg_id, name)
+            user_id = user.id
+
+        self._remember(tg_id, user_id)
+        return user_id
+
+    def _remember(self, tg_id: int, user_id: int):
+        self.items[tg_id] = user_id
+        self.items.move_to_end(tg_id)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.items),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+user_ids = UserIdentityCache(settings.USER_CACHE_SIZE)
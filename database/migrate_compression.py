@@ -0,0 +1,66 @@
+"""Разовое сжатие уже сохраненных текстов.
+
+Запуск: python -m database.migrate_compression
+
+Строки, которые уже сжаты, пропускаются, поэтому команду можно запускать повторно.
+"""
+import sqlalchemy as sa
+from database.compression import MARKER, compress
+from database.db_session import global_init, create_session
+
+COLUMNS = {
+    "essays": ("id", ["content"]),
+    "messages": ("id", ["text", "answer"]),
+    "check_results": ("key", ["answer"]),
+}
+
+BATCH_SIZE = 500
+
+
+def migrate_table(session, name: str, key: str, columns: list) -> int:
+    table = sa.table(name, sa.column(key), *[sa.column(column, sa.Text) for column in columns])
+    last = None
+    updated = 0
+
+    while True:
+        query = sa.select(table).order_by(table.c[key]).limit(BATCH_SIZE)
+        if last is not None:
+            query = query.where(table.c[key] > last)
+        rows = session.execute(query).all()
+        if not rows:
+            break
+
+        for row in rows:
+            values = {}
+            for column in columns:
+                value = getattr(row, column)
+                if value and not value.startswith(MARKER):
+                    packed = compress(value)
+                    if packed != value:
+                        values[column] = packed
+            if values:
+                session.execute(sa.update(table).where(table.c[key] == getattr(row, key)).values(**values))
+                updated += 1
+
+        session.commit()
+        last = getattr(rows[-1], key)
+
+    return updated
+
+
+def main():
+    global_init()
+    session = create_session()
+
+    for name, (key, columns) in COLUMNS.items():
+        print(f"{name}: сжато строк {migrate_table(session, name, key, columns)}")
+
+    if session.bind.dialect.name == "sqlite":
+        session.commit()
+        session.connection().exec_driver_sql("VACUUM")
+
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
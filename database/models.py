@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from database.db_session import SqlAlchemyBase
+from database.compression import CompressedText
 
 
 class User(SqlAlchemyBase):
@@ -21,8 +22,8 @@ class Message(SqlAlchemyBase):
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    text = Column(Text)
-    answer = Column(Text)
+    text = Column(CompressedText)
+    answer = Column(CompressedText)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="messages")
@@ -30,11 +31,14 @@ class Message(SqlAlchemyBase):
 
 class Essay(SqlAlchemyBase):
     __tablename__ = "essays"
+    __table_args__ = (
+        Index("ix_essays_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     topic = Column(String)
-    content = Column(Text)
+    content = deferred(Column(CompressedText))
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="essays")
@@ -50,4 +54,28 @@ class Template(SqlAlchemyBase):
     is_default = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="templates")
\ No newline at end of file
+    user = relationship("User", back_populates="templates")
+
+class CheckResult(SqlAlchemyBase):
+    __tablename__ = "check_results"
+
+    key = Column(String, primary_key=True)
+    answer = Column(CompressedText)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TopicSignature(SqlAlchemyBase):
+    __tablename__ = "topic_signatures"
+
+    essay_id = Column(Integer, ForeignKey("essays.id"), primary_key=True)
+    version = Column(Integer)
+    signature = Column(LargeBinary)
+
+
+class FsmRecord(SqlAlchemyBase):
+    __tablename__ = "fsm_records"
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    data = Column(Text, default="{}")
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,53 @@
+from sqlalchemy import select, or_, and_
+from sqlalchemy.orm import undefer
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import User, Essay, Template
+
+
+async def get_user(session: AsyncSession, tg_id: int, name: str) -> User:
+    user = await session.scalar(select(User).filter_by(tg_id=tg_id))
+    if not user:
+        user = User(tg_id=tg_id, name=name)
+        session.add(user)
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            user = await session.scalar(select(User).filter_by(tg_id=tg_id))
+    return user
+
+
+async def get_templates(session: AsyncSession, user_id: int) -> list[Template]:
+    result = await session.scalars(select(Template).filter_by(user_id=user_id))
+    return list(result)
+
+
+async def get_template(session: AsyncSession, template_id: int) -> Template:
+    return await session.get(Template, template_id)
+
+
+async def add_template(session: AsyncSession, user_id: int, name: str, content: str) -> Template:
+    template = Template(user_id=user_id, name=name, content=content)
+    session.add(template)
+    await session.commit()
+    return template
+
+
+async def get_essay_page(session: AsyncSession, user_id: int, before: tuple = None, limit: int = 5) -> list:
+    # Постраничная выборка по ключу (created_at, id): без OFFSET и без текста сочинений
+    query = select(Essay.id, Essay.topic, Essay.created_at).filter_by(user_id=user_id)
+    if before:
+        created_at, essay_id = before
+        query = query.where(or_(
+            Essay.created_at < created_at,
+            and_(Essay.created_at == created_at, Essay.id < essay_id)
+        ))
+    query = query.order_by(Essay.created_at.desc(), Essay.id.desc()).limit(limit)
+
+    result = await session.execute(query)
+    return list(result)
+
+
+async def get_essay(session: AsyncSession, essay_id: int) -> Essay:
+    return await session.scalar(select(Essay).options(undefer(Essay.content)).filter_by(id=essay_id))
@@ -0,0 +1,188 @@
+"""Полнотекстовый поиск по сочинениям и проверкам (SQLite FTS5).
+
+Тексты в таблицах хранятся сжатыми, поэтому индекс заполняется не SQL-триггерами,
+а из приложения при вставке строки, в той же транзакции. Удаления
+отслеживаются обычными триггерами: для них текст не нужен.
+
+Перестроение индекса по уже сохраненным данным: python -m database.search_index
+"""
+import html
+import re
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Essay, Message
+
+BATCH_SIZE = 500
+STEM_LENGTH = 4
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+QUERY_WORD = re.compile(r"\w+")
+
+SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        owner, title, body,
+        kind UNINDEXED, ref_id UNINDEXED, created_at UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    # Совпадение в теме весит больше, чем в тексте
+    "INSERT INTO search_index(search_index, rank) VALUES ('rank', 'bm25(0.0, 10.0, 1.0)')",
+    """CREATE TRIGGER IF NOT EXISTS essays_search_delete AFTER DELETE ON essays BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_search_delete AFTER DELETE ON messages BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+    END""",
+]
+
+INSERT = sa.text(
+    "INSERT INTO search_index(rowid, owner, title, body, kind, ref_id, created_at) "
+    "VALUES (:rowid, :owner, :title, :body, :kind, :ref_id, :created_at)"
+)
+
+# bm25 зависит от статистики всей таблицы, поэтому порядок результатов фиксируется
+# один раз при поиске, а страницы потом выбираются по сохраненным rowid
+SEARCH = sa.text("""
+    SELECT rowid
+    FROM search_index
+    WHERE search_index MATCH :query
+    ORDER BY rank, rowid
+    LIMIT :limit
+""")
+
+FETCH = sa.text(f"""
+    SELECT rowid, kind, ref_id, title, created_at,
+        snippet(search_index, 2, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16) AS snippet
+    FROM search_index
+    WHERE search_index MATCH :query AND rowid IN :rowids
+""").bindparams(sa.bindparam("rowids", expanding=True))
+
+enabled = False
+
+
+def essay_row(essay_id: int, user_id: int, topic: str, content: str, created_at) -> dict:
+    return {
+        "rowid": essay_id * 2,
+        "owner": f"u{user_id}",
+        "title": topic or "",
+        # В сочинениях хранится текст, уже подготовленный для Telegram, с HTML-сущностями
+        "body": html.unescape(content or ""),
+        "kind": "essay",
+        "ref_id": essay_id,
+        "created_at": str(created_at),
+    }
+
+
+def message_row(message_id: int, user_id: int, text: str, created_at) -> dict:
+    return {
+        "rowid": message_id * 2 + 1,
+        "owner": f"u{user_id}",
+        "title": "",
+        "body": text or "",
+        "kind": "check",
+        "ref_id": message_id,
+        "created_at": str(created_at),
+    }
+
+
+@event.listens_for(Essay, "after_insert")
+def index_essay(mapper, connection, essay: Essay):
+    if enabled:
+        connection.execute(INSERT, essay_row(essay.id, essay.user_id, essay.topic, essay.content, essay.created_at))
+
+
+@event.listens_for(Message, "after_insert")
+def index_message(mapper, connection, message: Message):
+    if enabled:
+        connection.execute(INSERT, message_row(message.id, message.user_id, message.text, message.created_at))
+
+
+def create_search_index(engine: sa.Engine):
+    """Создает индекс, если база SQLite. Новый индекс сразу заполняется уже сохраненными данными."""
+    global enabled
+
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as connection:
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'search_index'"
+        ).first()
+        for statement in SCHEMA:
+            connection.exec_driver_sql(statement)
+
+    enabled = True
+    if not exists:
+        rebuild(engine)
+
+
+def rebuild(engine: sa.Engine) -> int:
+    indexed = 0
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM search_index")
+
+        queries = [
+            (sa.select(Essay.id, Essay.user_id, Essay.topic, Essay.content, Essay.created_at), essay_row),
+            (sa.select(Message.id, Message.user_id, Message.text, Message.created_at), message_row),
+        ]
+        for query, make_row in queries:
+            result = connection.execution_options(yield_per=BATCH_SIZE).execute(query)
+            for rows in result.partitions():
+                connection.execute(INSERT, [make_row(*row) for row in rows])
+                indexed += len(rows)
+
+        connection.exec_driver_sql("INSERT INTO search_index(search_index) VALUES ('optimize')")
+    return indexed
+
+
+def search_available() -> bool:
+    return enabled
+
+
+def build_match(user_id: int, query: str) -> str | None:
+    # Слова ищутся по префиксу без окончания, чтобы находились другие формы: «татьяна» -> «татья»*
+    words = [word[:max(STEM_LENGTH, len(word) - 2)] for word in QUERY_WORD.findall(query.lower())]
+    if not words:
+        return None
+    terms = " ".join(f'"{word}"*' for word in words[:10])
+    # Слова ищутся только в теме и тексте, иначе запрос «u123» совпал бы с владельцем каждой записи
+    return f"owner : u{user_id} AND {{title body}} : ({terms})"
+
+
+async def search(session: AsyncSession, user_id: int, query: str, limit: int) -> list[int]:
+    """rowid первых limit результатов поиска, от самых подходящих."""
+    match = build_match(user_id, query)
+    if match is None:
+        return []
+
+    result = await session.execute(SEARCH, {"query": match, "limit": limit})
+    return list(result.scalars())
+
+
+async def fetch_results(session: AsyncSession, user_id: int, query: str, rowids: list[int]) -> list:
+    """Результаты с фрагментами текста в порядке rowids. Удаленные с момента поиска записи пропускаются."""
+    match = build_match(user_id, query)
+    if match is None or not rowids:
+        return []
+
+    result = await session.execute(FETCH, {"query": match, "rowids": rowids})
+    rows = {row.rowid: row for row in result}
+    return [rows[rowid] for rowid in rowids if rowid in rows]
+
+
+def main():
+    from database.db_session import global_init, create_session
+
+    global_init()
+    session = create_session()
+    if session.bind.dialect.name != "sqlite":
+        print("Полнотекстовый поиск доступен только для SQLite")
+        return
+
+    print(f"Проиндексировано записей: {rebuild(session.bind)}")
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import hashlib
+import random
+import re
+from array import array
+from sqlalchemy import select, and_
+from config.settings import settings
+from database.db_session import create_async_session
+from database.models import Essay, TopicSignature
+from database.writer import writer
+
+VERSION = 1
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+PRIME = (1 << 61) - 1
+STEM_LENGTH = 5
+
+WORD = re.compile(r"[a-zа-я0-9]+")
+STOPWORDS = {
+    "в", "во", "на", "о", "об", "и", "с", "со", "по", "к", "у", "из", "за", "для", "как", "что", "его", "ее", "их",
+    "образ", "роман", "романе", "поэма", "поэме", "повесть", "повести", "рассказ", "рассказе", "пьеса", "пьесе",
+    "произведение", "произведении", "сочинение", "тема", "тему", "герой", "героя", "героев",
+}
+
+# Коэффициенты хеш-функций фиксированы: сигнатуры хранятся в базе и должны совпадать между запусками
+_random = random.Random(VERSION)
+HASH_PARAMS = [(_random.randrange(1, PRIME), _random.randrange(0, PRIME)) for _ in range(NUM_HASHES)]
+
+
+def normalize_topic(topic: str) -> list[str]:
+    words = WORD.findall(topic.lower().replace("ё", "е"))
+    # Грубая основа слова: первые буквы, чтобы «Татьяны» и «Татьяна» совпадали
+    return [word[:STEM_LENGTH] for word in words if word not in STOPWORDS]
+
+
+def shingles(topic: str) -> set:
+    result = set()
+    for stem in normalize_topic(topic):
+        padded = f" {stem} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def stable_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(topic: str) -> tuple:
+    hashes = [stable_hash(shingle) for shingle in shingles(topic)]
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % PRIME for h in hashes) for a, b in HASH_PARAMS)
+
+
+def similarity(first: tuple, second: tuple) -> float:
+    return sum(x == y for x, y in zip(first, second)) / NUM_HASHES
+
+
+class TopicIndex:
+    """Индекс похожих тем сочинений: MinHash по триграммам основ слов и LSH по полосам сигнатуры.
+
+    Кандидаты - сочинения, у которых совпала хотя бы одна полоса из ROWS значений,
+    затем сходство уточняется по всей сигнатуре. Сигнатуры хранятся в таблице topic_signatures.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.signatures = {}
+        self.topics = {}
+        self.buckets = {}
+
+    async def warm_up(self):
+        async with create_async_session() as session:
+            result = await session.execute(
+                select(Essay.id, Essay.topic, TopicSignature.signature).outerjoin(
+                    TopicSignature,
+                    and_(TopicSignature.essay_id == Essay.id, TopicSignature.version == VERSION)
+                )
+            )
+            rows = list(result)
+
+        for essay_id, topic, signature in rows:
+            if signature is not None:
+                self._insert(essay_id, topic, tuple(array("Q", signature)))
+            else:
+                # Сочинение сохранено до появления индекса или при другой версии сигнатур
+                self.add(essay_id, topic or "")
+
+    def add(self, essay_id: int, topic: str):
+        signature = minhash(topic)
+        if not signature:
+            return
+        self._insert(essay_id, topic, signature)
+        writer.add(TopicSignature(essay_id=essay_id, version=VERSION, signature=array("Q", signature).tobytes()))
+
+    def find(self, topic: str) -> tuple | None:
+        """Самое похожее сочинение: (essay_id, тема, сходство) или None, если сходство ниже порога."""
+        signature = minhash(topic)
+        if not signature:
+            return None
+
+        candidates = set()
+        for key in self._bands(signature):
+            candidates.update(self.buckets.get(key, ()))
+
+        best = None
+        for essay_id in candidates:
+            score = similarity(signature, self.signatures[essay_id])
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (essay_id, self.topics[essay_id], score)
+        return best
+
+    def stats(self) -> dict:
+        return {
+            "essays": len(self.signatures),
+            "buckets": len(self.buckets),
+        }
+
+    def _bands(self, signature: tuple):
+        for band in range(BANDS):
+            yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+    def _insert(self, essay_id: int, topic: str, signature: tuple):
+        self.signatures[essay_id] = signature
+        self.topics[essay_id] = topic
+        for key in self._bands(signature):
+            self.buckets.setdefault(key, set()).add(essay_id)
+
+
+topic_index = TopicIndex(settings.TOPIC_MATCH_THRESHOLD)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from config.settings import settings
+from database.db_session import create_async_session
+
+
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError, OSError)
+
+
+def is_transient(error: Exception) -> bool:
+    # Занятая или недоступная база, оборванное соединение: строки запишутся, когда база вернется
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+class WriteBehind:
+    """Откладывает запись строк и сохраняет их пачками в фоновой задаче.
+
+    Пачка пишется, когда накопилось batch_size строк или прошло interval секунд.
+    При остановке все оставшиеся строки сохраняются.
+    Если база временно недоступна, пачка остается в очереди и повторяется с растущей
+    паузой до max_backoff секунд. Если пачку не пропускает сама база (нарушение
+    ограничений, неверные данные), строки сохраняются по одной, а не записавшиеся
+    отбрасываются, чтобы не держать очередь.
+    on_saved вызывается с сохраненной строкой после коммита, когда уже известен ее id.
+    """
+
+    def __init__(self, batch_size: int, interval: float, max_backoff: float):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.rows = []
+        self.in_flight = []
+        self.on_saved = {}
+        self.full = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.stopping = False
+        self.failures = 0
+        self.retry_at = 0.0
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        self.stopping = False
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Фоновая задача не отменяется, а дописывает текущую пачку и выходит из цикла
+        if self.task:
+            self.stopping = True
+            self.full.set()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.flush()
+        if self.rows:
+            print(f"При остановке не удалось сохранить строк: {len(self.rows)}")
+
+    def add(self, row, on_saved=None):
+        self.rows.append(row)
+        if on_saved:
+            self.on_saved[id(row)] = on_saved
+        if len(self.rows) >= self.batch_size:
+            self.full.set()
+
+    def has_pending(self, user_id: int) -> bool:
+        # Пачка, которая сейчас коммитится, тоже еще не видна в базе
+        return any(getattr(row, "user_id", None) == user_id for row in self.rows + self.in_flight)
+
+    def find(self, predicate):
+        for row in reversed(self.in_flight + self.rows):
+            if predicate(row):
+                return row
+        return None
+
+    async def flush(self):
+        async with self.lock:
+            rows, self.rows = self.rows, []
+            self.full.clear()
+            if not rows:
+                return
+
+            self.in_flight = rows
+            try:
+                saved = await self._save(rows)
+            except Exception as e:
+                if is_transient(e):
+                    self._retry_later(rows, e)
+                    return
+                print("Пачка не записалась, сохраняю строки по одной:", e)
+                saved = await self._save_each(rows)
+            except BaseException:
+                # Отмена посреди коммита: пачка возвращается в очередь и сохранится следующим flush
+                self.rows = rows + self.rows
+                raise
+            finally:
+                self.in_flight = []
+
+            self.flushes += 1
+
+            for row, merged in saved:
+                try:
+                    self.on_saved.pop(id(row))(merged)
+                except Exception as e:
+                    print("Ошибка обработки сохраненной строки:", e)
+
+    async def _save(self, rows: list) -> list:
+        saved = []
+        async with create_async_session() as session:
+            for row in rows:
+                merged = await session.merge(row)
+                if id(row) in self.on_saved:
+                    saved.append((row, merged))
+            await session.commit()
+        self.written += len(rows)
+        self.failures = 0
+        self.retry_at = 0.0
+        return saved
+
+    async def _save_each(self, rows: list) -> list:
+        saved = []
+        for i, row in enumerate(rows):
+            try:
+                saved += await self._save([row])
+            except Exception as e:
+                if is_transient(e):
+                    self._retry_later(rows[i:], e)
+                    break
+                print(f"Строка {type(row).__name__} не записана в базу данных и отброшена:", e)
+                self.on_saved.pop(id(row), None)
+                self.dropped += 1
+            except BaseException:
+                self.rows = rows[i:] + self.rows
+                raise
+        return saved
+
+    def _retry_later(self, rows: list, error: Exception):
+        self.rows = rows + self.rows
+        self.failures += 1
+        delay = min(self.interval * 2 ** self.failures, self.max_backoff)
+        self.retry_at = time.monotonic() + delay
+        print(f"Ошибка записи в базу данных, повтор через {delay:.1f} с:", error)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.rows) + len(self.in_flight),
+            "flushes": self.flushes,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+    async def _run(self):
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(self.full.wait(), max(self.interval, self.retry_at - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+            if self.stopping:
+                break
+            if time.monotonic() < self.retry_at:
+                # Пока база недоступна, новые строки только копятся в очереди
+                self.full.clear()
+                continue
+            await self.flush()
+
+
+writer = WriteBehind(settings.WRITE_BATCH_SIZE, settings.WRITE_FLUSH_INTERVAL, settings.WRITE_MAX_BACKOFF)
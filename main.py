@@ -1,18 +1,125 @@
 import asyncio
+import signal
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
 from bott.bot import bot, dp, bot_commands
-from bott.handlers import router
-from database.db_session import global_init
+from bott.delivery import delivery
+from bott.handlers import router, history_cache
+from config.settings import settings
+from database.db_session import global_init, global_close
+from database.identity import user_ids
+from database.topic_index import topic_index
+from database.writer import writer
+from ai.agent import ai_client, check_cache
+from ai.scheduler import scheduler
+from metrics import metrics, serve_metrics
 
+exporter = None
 
-async def main():
-    global_init(True, "db/esse.db")
+
+def register_gauges():
+    metrics.gauge("llm_in_flight", lambda: ai_client.in_flight, "Запросы к GigaChat, выполняемые сейчас")
+    metrics.gauge("scheduler_queued", lambda: scheduler.size, "Задачи в очереди к модели")
+    metrics.gauge("scheduler_running", lambda: scheduler.running, "Задачи, обрабатываемые моделью")
+    metrics.gauge("history_cache_items", lambda: len(history_cache), "Записи в кэше истории")
+    metrics.gauge("history_cache_bytes", lambda: history_cache.bytes, "Примерный размер кэша истории")
+    metrics.gauge("writer_pending", lambda: writer.stats()["pending"], "Строки, ожидающие записи в базу")
+    metrics.gauge("delivery_queued", lambda: delivery.stats()["queued"], "Сообщения, ожидающие отправки в Telegram")
+
+
+async def on_startup(register_commands: bool = True, metrics_port: int = settings.METRICS_PORT):
+    global exporter
+
+    global_init()
+    await user_ids.warm_up()
+    await topic_index.warm_up()
     dp.include_router(router)
 
-    await bot_commands()
+    if register_commands:
+        await bot_commands()
+
+    scheduler.start()
+    writer.start()
+    check_cache.start()
 
+    register_gauges()
+    if metrics_port:
+        exporter = await serve_metrics(settings.METRICS_HOST, metrics_port)
+        print(f"Метрики доступны на http://{settings.METRICS_HOST}:{metrics_port}/metrics")
+
+
+async def on_shutdown():
+    if exporter:
+        await exporter.cleanup()
+    await scheduler.stop()
+    await check_cache.stop()
+    await writer.stop()
+    await ai_client.close()
+    await global_close()
+    await bot.session.close()
+
+
+async def run_polling():
     print("Бот запущен")
     await dp.start_polling(bot)
 
 
+async def run_webhook():
+    app = web.Application()
+    # Обновление ставится в фоновую задачу, а Telegram сразу получает ответ 200
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=settings.WEBHOOK_SECRET
+    ).register(app, path=settings.WEBHOOK_PATH)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT).start()
+
+    if settings.WEBHOOK_URL:
+        await bot.set_webhook(
+            settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+            secret_token=settings.WEBHOOK_SECRET
+        )
+
+    # Как и start_polling, по SIGTERM/SIGINT завершаемся штатно, чтобы on_shutdown сохранил отложенные записи
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Бот запущен, webhook слушает {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+    try:
+        await stop.wait()
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(sig)
+        await runner.cleanup()
+    print("Бот остановлен")
+
+
+async def main():
+    # Без секрета любой, кто достучится до порта, сможет присылать поддельные обновления от имени пользователей
+    if settings.BOT_MODE == "webhook" and not settings.WEBHOOK_SECRET:
+        print("Для режима webhook задайте WEBHOOK_SECRET")
+        return
+
+    if settings.WORKERS > 1:
+        from supervisor import Supervisor
+        await Supervisor(settings.WORKERS).run()
+        return
+
+    await on_startup()
+    try:
+        if settings.BOT_MODE == "webhook":
+            await run_webhook()
+        else:
+            await run_polling()
+    finally:
+        await on_shutdown()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""Метрики бота: гистограммы времени, счетчики и датчики текущих значений.
+
+Метрики отдаются в текстовом формате Prometheus по адресу /metrics на
+локальном порту METRICS_PORT и кратко показываются администраторам по команде /stats.
+"""
+import bisect
+import time
+from contextlib import asynccontextmanager
+from aiohttp import web
+from aiogram import BaseMiddleware
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        # Оценка по границам корзин, как histogram_quantile в Prometheus
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.help = {}
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        self.histograms.setdefault(name, {}).setdefault(key, Histogram()).observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+    def gauge(self, name: str, read, description: str = ""):
+        self.gauges[name] = read
+        self.help[name] = description
+
+    @asynccontextmanager
+    async def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        lines = []
+        for name, series in self.histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                total = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    total += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {total}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        for name, series in self.counters.items():
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{format_labels(labels)} {value}")
+
+        for name, read in self.gauges.items():
+            if self.help[name]:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        lines = []
+        for name, series in self.histograms.items():
+            lines.append(f"{name}:")
+            for labels, histogram in sorted(series.items(), key=lambda item: -item[1].count):
+                label = ", ".join(str(value) for _, value in labels) or "все"
+                lines.append(
+                    f"  {label}: {histogram.count} шт., "
+                    f"p50 {histogram.quantile(0.5):.3f} с, p95 {histogram.quantile(0.95):.3f} с, p99 {histogram.quantile(0.99):.3f} с"
+                )
+
+        for name, series in self.counters.items():
+            lines.append(f"{name}:")
+            for labels, value in series.items():
+                label = ", ".join(str(value) for _, value in labels) or "все"
+                lines.append(f"  {label}: {value:g}")
+
+        for name, read in self.gauges.items():
+            lines.append(f"{name}: {read()}")
+        return "\n".join(lines)
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Время работы и ошибки каждого обработчика роутера."""
+
+    async def __call__(self, handler, event, data):
+        name = data["handler"].callback.__name__
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.inc("bot_handler_errors_total", handler=name)
+            raise
+        finally:
+            metrics.observe("bot_handler_seconds", time.perf_counter() - start, handler=name)
+
+
+async def serve_metrics(host: str, port: int) -> web.AppRunner:
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,245 @@
+"""Запуск бота в нескольких процессах.
+
+Супервизор получает обновления (long polling или webhook) и раскладывает их
+по рабочим процессам по id пользователя: все обновления одного пользователя
+обрабатывает один и тот же процесс, поэтому сохраняется порядок и состояние FSM.
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from aiohttp import web
+from bott.bot import bot, dp, bot_commands
+from config.settings import settings
+
+HEALTH_INTERVAL = 10
+STOP_TIMEOUT = 30
+
+
+def route_key(raw: dict) -> int:
+    for event in raw.values():
+        if not isinstance(event, dict):
+            continue
+        if "from" in event:
+            return event["from"]["id"]
+        if "chat" in event:
+            return event["chat"]["id"]
+    return raw["update_id"]
+
+
+async def feed_update(raw: dict):
+    try:
+        await dp.feed_raw_update(bot, raw)
+    except Exception as e:
+        print("Ошибка обработки обновления:", e)
+
+
+def worker_main(index: int, updates, health):
+    asyncio.run(run_worker(index, updates, health))
+
+
+async def run_worker(index: int, updates, health):
+    from main import on_startup, on_shutdown
+
+    # Ctrl+C получает вся группа процессов, останавливать рабочие процессы должен супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    parent = multiprocessing.parent_process()
+    # У каждого процесса свой порт метрик: METRICS_PORT + 1 + номер процесса
+    await on_startup(register_commands=False, metrics_port=settings.METRICS_PORT + 1 + index if settings.METRICS_PORT else 0)
+
+    started_at = time.monotonic()
+    tasks = set()
+    processed = 0
+    last_report = 0.0
+
+    def report():
+        health.put({
+            "worker": index,
+            "pid": os.getpid(),
+            "processed": processed,
+            "in_flight": len(tasks),
+            "uptime": round(time.monotonic() - started_at),
+        })
+
+    try:
+        while not stop.is_set():
+            # Без супервизора процесс остался бы сиротой и держал порт метрик
+            if parent is not None and not parent.is_alive():
+                print(f"Процесс {index}: супервизор завершился, останавливаюсь")
+                break
+
+            try:
+                raw = await asyncio.to_thread(updates.get, True, 1.0)
+            except Exception:
+                raw = False
+
+            if raw is None:
+                break
+            if raw:
+                task = asyncio.create_task(feed_update(raw))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                processed += 1
+
+            if time.monotonic() - last_report > HEALTH_INTERVAL:
+                report()
+                last_report = time.monotonic()
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        report()
+        await on_shutdown()
+
+
+class Supervisor:
+    def __init__(self, workers: int):
+        self.context = multiprocessing.get_context("spawn")
+        self.queues = [self.context.Queue() for _ in range(workers)]
+        self.health_queue = self.context.Queue()
+        self.processes = [None] * workers
+        self.reports = {}
+        self.routed = [0] * workers
+        self.restarting = set()
+
+    def start_worker(self, index: int):
+        process = self.context.Process(
+            target=worker_main,
+            args=(index, self.queues[index], self.health_queue),
+            name=f"bot-worker-{index}",
+            daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+
+    async def stop_worker(self, index: int):
+        process = self.processes[index]
+        if process is None or not process.is_alive():
+            return
+        self.queues[index].put(None)
+        await asyncio.to_thread(process.join, STOP_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+
+    async def restart_worker(self, index: int):
+        # Новые обновления копятся в очереди этого процесса, пока он перезапускается
+        self.restarting.add(index)
+        try:
+            await self.stop_worker(index)
+            self.start_worker(index)
+        finally:
+            self.restarting.discard(index)
+
+    async def rolling_restart(self):
+        for index in range(len(self.processes)):
+            await self.restart_worker(index)
+
+    def route(self, raw: dict):
+        index = route_key(raw) % len(self.queues)
+        self.queues[index].put(raw)
+        self.routed[index] += 1
+
+    def health(self) -> dict:
+        workers = []
+        for index, process in enumerate(self.processes):
+            report = self.reports.get(index, {})
+            workers.append({
+                "worker": index,
+                "alive": bool(process and process.is_alive()),
+                "routed": self.routed[index],
+                **report,
+            })
+        return {
+            "workers": workers,
+            "alive": sum(worker["alive"] for worker in workers),
+            "processed": sum(worker.get("processed", 0) for worker in workers),
+            "in_flight": sum(worker.get("in_flight", 0) for worker in workers),
+        }
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            while not self.health_queue.empty():
+                report = self.health_queue.get_nowait()
+                self.reports[report["worker"]] = report
+
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and index not in self.restarting:
+                    print(f"Процесс {index} завершился с кодом {process.exitcode}, перезапускаю")
+                    self.start_worker(index)
+
+            state = self.health()
+            print(f"Процессов: {state['alive']}/{len(self.processes)}, обработано: {state['processed']}, в работе: {state['in_flight']}")
+
+    async def poll(self):
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30)
+            except Exception as e:
+                print("Ошибка получения обновлений:", e)
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                self.route(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+
+    async def serve_webhook(self):
+        async def handle(request: web.Request) -> web.Response:
+            if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != settings.WEBHOOK_SECRET:
+                return web.Response(status=401)
+            self.route(await request.json())
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(settings.WEBHOOK_PATH, handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT).start()
+
+        if settings.WEBHOOK_URL:
+            await bot.set_webhook(
+                settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+                secret_token=settings.WEBHOOK_SECRET
+            )
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self.rolling_restart()))
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        for index in range(len(self.processes)):
+            self.start_worker(index)
+
+        watcher = asyncio.create_task(self.watch())
+        receiver = None
+        try:
+            await bot_commands()
+
+            print(f"Бот запущен, рабочих процессов: {len(self.processes)}")
+            receiver = asyncio.create_task(self.serve_webhook() if settings.BOT_MODE == "webhook" else self.poll())
+            stopping = asyncio.create_task(stop.wait())
+            await asyncio.wait({receiver, stopping}, return_when=asyncio.FIRST_COMPLETED)
+            stopping.cancel()
+            if receiver.done():
+                receiver.result()
+        finally:
+            # Сначала перестаем принимать обновления и перезапускать процессы, затем даем процессам дописать очередь
+            for task in (receiver, watcher):
+                if task:
+                    task.cancel()
+            await asyncio.gather(*[task for task in (receiver, watcher) if task], return_exceptions=True)
+            await asyncio.gather(*[self.stop_worker(index) for index in range(len(self.processes))])
+            await bot.session.close()
+            print("Бот остановлен")
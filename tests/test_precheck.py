@@ -0,0 +1,29 @@
+import pytest
+from ai.precheck import pre_checker
+
+CORRECT_SENTENCES = [
+    "Герой читал книги, журналы, газеты и т. д. и т. п.",
+    "В 1825 г. произошло восстание декабристов.",
+    "В XIX в. появились толстые журналы, альманахи и др. издания.",
+    "Писатель, т. е. автор романа, сам выступает рассказчиком.",
+    "Татьяна любит Онегина, но выходит замуж за другого.",
+    "Я думаю, что автор прав.",
+    "Он долго молчал... а потом заговорил.",
+]
+
+
+@pytest.mark.parametrize("sentence", CORRECT_SENTENCES)
+def test_correct_sentence_has_no_findings(sentence):
+    assert pre_checker.check(sentence) == []
+
+
+def test_lowercase_after_sentence_end():
+    findings = pre_checker.check("Онегин уехал в деревню. там он скучал.")
+    assert len(findings) == 1
+    assert "строчной буквы" in findings[0]
+
+
+def test_same_finding_reported_once():
+    # Оба совпадения дают одинаковый фрагмент: короткое предложение целиком
+    findings = pre_checker.check("Умен но ленив но добр.")
+    assert len(findings) == 1